@@ -19,6 +19,10 @@ from dataclasses import dataclass, field
 
 from ..config import CONVERSATIONS_DIR
 
+# Fraction of the token budget above which get_messages_for_api() sends a
+# local digest of older messages instead of the full history
+SUMMARY_THRESHOLD = 0.8
+
 
 @dataclass
 class Conversation:
@@ -35,6 +39,19 @@ class Conversation:
         if not self.created_at:
             self.created_at = time.time()
         self.compaction_enabled = True
+        # (api_style, max_chars) -> (message count, last message, api messages)
+        self._api_cache = {}
+        # id(message) -> (message, encoded JSON); see message_json()
+        self._json_cache = {}
+        # (api_style, id(message)) -> (message, provider-format message)
+        self._converted = {}
+        # (split index, max_chars, summary message) of the context summary
+        # sent by get_messages_for_api(); see _summary_split_index()
+        self._summary = None
+        # Running character total for estimated_tokens(), one count per message
+        self._char_counts = []
+        self._char_total = 0
+        self._counted_messages = None
 
     def add_user_message(self, content: str, images: list[dict] | None = None):
         """Add a user message, optionally with image content blocks.
@@ -50,6 +67,7 @@ class Conversation:
             self.messages.append({"role": "user", "content": blocks})
         else:
             self.messages.append({"role": "user", "content": content})
+        self._on_message_added()
 
     def add_assistant_message(self, content: str, tool_calls: list[dict] | None = None):
         """Add an assistant message, optionally with tool calls."""
@@ -57,6 +75,7 @@ class Conversation:
         if tool_calls:
             msg["tool_calls"] = tool_calls
         self.messages.append(msg)
+        self._on_message_added()
 
     def add_tool_result(self, tool_call_id: str, content: str):
         """Add a tool result message."""
@@ -65,6 +84,7 @@ class Conversation:
             "tool_call_id": tool_call_id,
             "content": content,
         })
+        self._on_message_added()
 
     def add_system_message(self, content: str):
         """Add a system-level message (execution results, errors, etc.)."""
@@ -74,27 +94,87 @@ class Conversation:
             "role": "user",
             "content": f"[System] {content}",
         })
+        self._on_message_added()
+
+    def _on_message_added(self):
+        """Update derived state after a message was appended."""
+        self._api_cache.clear()
+        if (self._counted_messages is self.messages
+                and len(self._char_counts) == len(self.messages) - 1):
+            chars = self._message_chars(self.messages[-1])
+            self._char_counts.append(chars)
+            self._char_total += chars
 
     def get_messages_for_api(self, max_chars: int = 100000,
                              api_style: str = "openai",
-                             describe_fn=None) -> list[dict]:
+                             describe_fn=None,
+                             token_budget: int | None = None,
+                             keep_recent: int = 20) -> list[dict]:
         """Get messages formatted for the LLM API.
 
         Truncates older messages if the total content exceeds max_chars.
         Converts from internal format to provider-specific format.
         Never splits a tool_call/tool_result pair during truncation.
+
+        If token_budget is given and the history is estimated above
+        SUMMARY_THRESHOLD of it, everything but the last keep_recent
+        messages is replaced by a locally built digest (see digest()).
+        The stored history is left untouched.
+
+        Results are cached per (api_style, max_chars, token_budget,
+        keep_recent) until the history changes; a fresh list is returned
+        each time. Calls with describe_fn bypass the cache since
+        descriptions are produced on demand.
         """
         if not self.messages:
             return []
 
+        if describe_fn is None:
+            key = (api_style, max_chars, token_budget, keep_recent)
+            cached = self._api_cache.get(key)
+            if (cached and cached[0] == len(self.messages)
+                    and cached[1] is self.messages[-1]):
+                return list(cached[2])
+            result = self._build_api_messages(
+                max_chars, api_style, None, token_budget, keep_recent)
+            self._api_cache[key] = (len(self.messages), self.messages[-1], result)
+            return list(result)
+
+        return self._build_api_messages(
+            max_chars, api_style, describe_fn, token_budget, keep_recent)
+
+    def _build_api_messages(self, max_chars: int, api_style: str,
+                            describe_fn, token_budget: int | None = None,
+                            keep_recent: int = 20) -> list[dict]:
+        """Truncate and convert the history (uncached get_messages_for_api)."""
+        messages = self.messages
+        if (token_budget
+                and self.estimated_tokens() > SUMMARY_THRESHOLD * token_budget):
+            split_idx = self._summary_split_index(keep_recent)
+            if split_idx > 1:
+                summary = self._summary
+                if (summary is None or summary[0] != split_idx
+                        or summary[1] != max_chars):
+                    digest = self.digest(messages[:split_idx])
+                    if len(digest) > max_chars // 4:
+                        digest = "...\n" + digest[-(max_chars // 4):]
+                    summary = self._summary = (split_idx, max_chars, {
+                        "role": "user",
+                        "content": (
+                            "[Context Summary — earlier messages condensed]\n\n"
+                            + digest
+                        ),
+                    })
+                messages = [summary[2]] + messages[split_idx:]
+
         # Walk backwards, collecting messages while respecting max_chars
         # and never splitting tool_call/tool_result pairs
         result = []
         total_chars = 0
 
-        i = len(self.messages) - 1
+        i = len(messages) - 1
         while i >= 0:
-            msg = self.messages[i]
+            msg = messages[i]
             content = msg.get("content", "")
             msg_chars = self._content_chars(content)
 
@@ -104,12 +184,12 @@ class Conversation:
                 # Collect all consecutive tool_results
                 tool_group = [msg]
                 j = i - 1
-                while j >= 0 and self.messages[j]["role"] == "tool_result":
-                    tool_group.insert(0, self.messages[j])
+                while j >= 0 and messages[j]["role"] == "tool_result":
+                    tool_group.insert(0, messages[j])
                     j -= 1
                 # The message before should be the assistant with tool_calls
-                if j >= 0 and self.messages[j]["role"] == "assistant":
-                    tool_group.insert(0, self.messages[j])
+                if j >= 0 and messages[j]["role"] == "assistant":
+                    tool_group.insert(0, messages[j])
                     j -= 1
 
                 group_chars = sum(self._content_chars(m.get("content", "")) for m in tool_group)
@@ -135,10 +215,37 @@ class Conversation:
             result = self._replace_images_with_descriptions(result, describe_fn)
 
         # Convert to provider format
+        return self._convert_messages(result, api_style)
+
+    def _convert_messages(self, messages: list[dict], api_style: str) -> list[dict]:
+        """Convert messages to provider format, reusing earlier conversions.
+
+        Returning the same dict for an unchanged message across sends lets
+        the client reuse its encoded JSON as well. The converted dicts are
+        shared and must not be modified.
+        """
         if api_style == "anthropic":
-            return self._to_anthropic_format(result)
+            convert = self._to_anthropic_format
         else:
-            return self._to_openai_format(result)
+            convert = self._to_openai_format
+        cache = self._converted
+        result = []
+        for msg in messages:
+            key = (api_style, id(msg))
+            cached = cache.get(key)
+            if cached is None or cached[0] is not msg:
+                cached = (msg, convert([msg])[0])
+                cache[key] = cached
+            result.append(cached[1])
+
+        # Drop conversions of synthetic messages (summaries, image
+        # descriptions) and of messages no longer in the history
+        if len(cache) > 2 * len(self.messages) + 16:
+            current = {id(m): m for m in self.messages}
+            self._converted = {
+                k: v for k, v in cache.items() if current.get(k[1]) is v[0]
+            }
+        return result
 
     def _to_openai_format(self, messages: list[dict]) -> list[dict]:
         """Convert internal messages to OpenAI API format."""
@@ -293,24 +400,43 @@ class Conversation:
     def clear(self):
         """Clear all messages."""
         self.messages.clear()
+        self._api_cache.clear()
+        self._converted.clear()
+        self._summary = None
+        self._char_counts = []
+        self._char_total = 0
+        self._json_cache.clear()
 
-    def estimated_tokens(self) -> int:
-        """Rough token estimate (chars / 4)."""
+    @staticmethod
+    def _message_chars(m: dict) -> int:
+        """Character count of one message for token estimation."""
         total_chars = 0
-        for m in self.messages:
-            content = m.get("content", "")
-            if isinstance(content, list):
-                for block in content:
-                    if block.get("type") == "text":
-                        total_chars += len(block.get("text", ""))
-                    elif block.get("type") == "image":
-                        total_chars += 1000  # rough estimate for image tokens
-            else:
-                total_chars += len(content)
-            # Also count tool call arguments
-            for tc in m.get("tool_calls", []):
-                total_chars += len(str(tc.get("arguments", {})))
-        return total_chars // 4
+        content = m.get("content", "")
+        if isinstance(content, list):
+            for block in content:
+                if block.get("type") == "text":
+                    total_chars += len(block.get("text", ""))
+                elif block.get("type") == "image":
+                    total_chars += 1000  # rough estimate for image tokens
+        else:
+            total_chars += len(content)
+        # Also count tool call arguments
+        for tc in m.get("tool_calls", []):
+            total_chars += len(str(tc.get("arguments", {})))
+        return total_chars
+
+    def estimated_tokens(self) -> int:
+        """Rough token estimate (chars / 4).
+
+        Uses a running total kept up to date by the add_* methods; the
+        history is recounted only when it was replaced or edited directly.
+        """
+        if (self._counted_messages is not self.messages
+                or len(self._char_counts) != len(self.messages)):
+            self._char_counts = [self._message_chars(m) for m in self.messages]
+            self._char_total = sum(self._char_counts)
+            self._counted_messages = self.messages
+        return self._char_total // 4
 
     def needs_compaction(self, threshold_tokens: int = 20000) -> bool:
         """Check if conversation is long enough to benefit from compaction."""
@@ -318,18 +444,26 @@ class Conversation:
             return False
         return self.estimated_tokens() > threshold_tokens and len(self.messages) > 6
 
-    def compact(self, summary: str, keep_recent: int = 4):
-        """Replace older messages with a summary, keeping the most recent messages.
+    def _summary_split_index(self, keep_recent: int) -> int:
+        """Split index for the context summary of get_messages_for_api().
 
-        Args:
-            summary: Text summarizing the older messages
-            keep_recent: Number of recent messages to preserve (at minimum)
+        The split stays where it is while the kept tail grows, and only
+        moves forward once the tail reaches 2 * keep_recent messages, so
+        consecutive requests start with the same summary message and
+        provider prompt caches keep matching.
         """
-        if len(self.messages) <= keep_recent + 1:
-            return  # Not enough messages to compact
+        summary = self._summary
+        if (summary is not None and summary[0] <= len(self.messages)
+                and len(self.messages) - summary[0] < 2 * keep_recent):
+            return summary[0]
+        return self._safe_split_index(keep_recent)
+
+    def _safe_split_index(self, keep_recent: int) -> int:
+        """Index splitting off the last ~keep_recent messages.
 
-        # Find a safe split point: never split in the middle of a tool_call/tool_result pair
-        split_idx = len(self.messages) - keep_recent
+        Never splits in the middle of a tool_call/tool_result pair.
+        """
+        split_idx = max(len(self.messages) - keep_recent, 0)
 
         # Walk backward from split_idx to ensure we don't break a tool pair
         while split_idx > 0 and self.messages[split_idx]["role"] == "tool_result":
@@ -338,7 +472,48 @@ class Conversation:
         if split_idx > 0 and self.messages[split_idx - 1]["role"] == "assistant":
             if self.messages[split_idx - 1].get("tool_calls"):
                 split_idx -= 1
+        return split_idx
 
+    @staticmethod
+    def digest(messages: list[dict]) -> str:
+        """Condense messages into one labelled line each, for summaries.
+
+        Long texts are cut to a few hundred characters and tool calls are
+        reduced to their names. Used as input for LLM compaction and as the
+        local summary in get_messages_for_api().
+        """
+        summary_parts = []
+        for msg in messages:
+            role = msg["role"]
+            content = Conversation.extract_text(msg.get("content", ""))
+            if role == "tool_result":
+                # Truncate long tool results for the summary request
+                if len(content) > 500:
+                    content = content[:500] + "..."
+                summary_parts.append(f"[Tool Result] {content}")
+            elif role == "assistant" and msg.get("tool_calls"):
+                tc_names = [tc["name"] for tc in msg["tool_calls"]]
+                summary_parts.append(f"[Assistant] Called tools: {', '.join(tc_names)}")
+                if content:
+                    summary_parts.append(f"  Text: {content[:300]}")
+            else:
+                label = "User" if role == "user" else "Assistant" if role == "assistant" else "System"
+                if len(content) > 500:
+                    content = content[:500] + "..."
+                summary_parts.append(f"[{label}] {content}")
+        return "\n".join(summary_parts)
+
+    def compact(self, summary: str, keep_recent: int = 4):
+        """Replace older messages with a summary, keeping the most recent messages.
+
+        Args:
+            summary: Text summarizing the older messages
+            keep_recent: Number of recent messages to preserve (at minimum)
+        """
+        if len(self.messages) <= keep_recent + 1:
+            return  # Not enough messages to compact
+
+        split_idx = self._safe_split_index(keep_recent)
         if split_idx <= 1:
             return  # Would compact everything, not useful
 
@@ -351,21 +526,50 @@ class Conversation:
             ),
         }
         self.messages = [summary_msg] + self.messages[split_idx:]
+        self._api_cache.clear()
+        self._converted.clear()
+        self._summary = None
+        self._json_cache = {
+            id(m): self._json_cache[id(m)] for m in self.messages
+            if id(m) in self._json_cache
+        }
 
     # ── Persistence ──────────────────────────────────────────
 
+    def message_json(self, msg: dict) -> str:
+        """Return *msg* encoded as an item of a top-level "messages" array.
+
+        The text matches json.dump(..., indent=2) output at that depth.
+        Messages are never modified after being added, so each one is
+        encoded once and reused by every later save.
+        """
+        cached = self._json_cache.get(id(msg))
+        if cached is None or cached[0] is not msg:
+            text = json.dumps(msg, indent=2, default=str).replace("\n", "\n    ")
+            cached = (msg, text)
+            self._json_cache[id(msg)] = cached
+        return cached[1]
+
     def save(self):
         """Save conversation to disk."""
         os.makedirs(CONVERSATIONS_DIR, exist_ok=True)
         path = os.path.join(CONVERSATIONS_DIR, f"{self.conversation_id}.json")
-        data = {
+        header = {
             "conversation_id": self.conversation_id,
             "created_at": self.created_at,
             "model": self.model,
-            "messages": self.messages,
         }
         with open(path, "w") as f:
-            json.dump(data, f, indent=2)
+            f.write("{")
+            for key, value in header.items():
+                f.write(f"\n  {json.dumps(key)}: {json.dumps(value)},")
+            f.write('\n  "messages": [')
+            sep = "\n    "
+            for msg in self.messages:
+                f.write(sep)
+                f.write(self.message_json(msg))
+                sep = ",\n    "
+            f.write("]\n}" if not self.messages else "\n  ]\n}")
 
     @classmethod
     def load(cls, conversation_id: str) -> "Conversation":
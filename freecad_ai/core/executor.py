@@ -35,8 +35,36 @@ CODE_BLOCK_RE = re.compile(r"```python\s*\n(.*?)```", re.DOTALL)
 
 
 def extract_code_blocks(text: str) -> list[str]:
-    """Extract all Python code blocks from markdown-formatted text."""
-    return CODE_BLOCK_RE.findall(text)
+    """Extract all Python code blocks from markdown-formatted text.
+
+    Returns the same blocks as CODE_BLOCK_RE.findall(text), but scans with
+    str.find so unterminated fences cost one pass instead of a backtracking
+    search from every opening fence.
+    """
+    blocks = []
+    find = text.find
+    n = len(text)
+    pos = 0
+    while True:
+        start = find("```python", pos)
+        if start < 0:
+            break
+        # \s*\n: the code starts after the last newline in the whitespace run
+        i = start + 9
+        code_start = -1
+        while i < n and text[i].isspace():
+            if text[i] == "\n":
+                code_start = i + 1
+            i += 1
+        if code_start < 0:
+            pos = start + 1
+            continue
+        end = find("```", code_start)
+        if end < 0:
+            break  # no closing fence for this or any later opening fence
+        blocks.append(text[code_start:end])
+        pos = end + 3
+    return blocks
 
 
 def _find_freecad_cmd() -> str:
@@ -2,11 +2,15 @@
 
 Assembles a dynamic system prompt that includes:
   1. Identity and instructions
-  2. Mode-specific behavior (Plan vs Act)
-  3. FreeCAD API reference (omitted when tools are active)
-  4. Code conventions
+  2. FreeCAD API reference (omitted when tools are active)
+  3. Code conventions
+  4. Mode-specific behavior (Plan vs Act)
   5. Current document context
   6. AGENTS.md project-level instructions
+
+Sections 1-3 form a static block that only depends on whether tools are
+enabled, so providers with prompt caching can reuse it across requests;
+the rest is rebuilt per request.
 """
 
 from .context import get_document_context
@@ -331,26 +335,22 @@ RESPONSE_FORMAT = """\
 - If you need more information to proceed, ask the user"""
 
 
-def build_system_prompt(mode: str = "plan", agents_md: str = "",
-                        tools_enabled: bool = False) -> str:
-    """Build the full system prompt.
+def build_document_section() -> str:
+    """Build the "Current Document State" section, or "" if there is no document."""
+    doc_ctx = get_document_context()
+    if not doc_ctx:
+        return ""
+    return f"## Current Document State\n{doc_ctx}\n"
+
+
+def build_static_sections(tools_enabled: bool = False) -> list[str]:
+    """Build the prompt sections that depend only on the tool setting.
 
     Args:
-        mode: "plan" or "act"
-        agents_md: Contents of AGENTS.md / FREECAD_AI.md file, if any
         tools_enabled: Whether tool calling is active (shorter prompt, no API ref)
     """
     sections = [IDENTITY, ""]
 
-    # Mode instructions
-    if tools_enabled and mode == "act":
-        sections.append(ACT_MODE_TOOLS)
-    elif mode == "plan":
-        sections.append(PLAN_MODE)
-    else:
-        sections.append(ACT_MODE)
-    sections.append("")
-
     if tools_enabled:
         # With tools, use abbreviated conventions (tools handle the API)
         sections.append(CODE_CONVENTIONS_TOOLS)
@@ -366,12 +366,34 @@ def build_system_prompt(mode: str = "plan", agents_md: str = "",
         sections.append(RESPONSE_FORMAT)
         sections.append("")
 
+    return sections
+
+
+def build_mode_section(mode: str = "plan", tools_enabled: bool = False) -> str:
+    """Return the mode instructions for plan or act mode."""
+    if tools_enabled and mode == "act":
+        return ACT_MODE_TOOLS
+    if mode == "plan":
+        return PLAN_MODE
+    return ACT_MODE
+
+
+def build_context_sections(agents_md: str = "") -> list[str]:
+    """Build the prompt sections that follow the active document.
+
+    The document state, skills list and AGENTS.md (found relative to the
+    document, with its variables filled in) can change between requests,
+    so these are rebuilt every time.
+
+    Args:
+        agents_md: Contents of AGENTS.md / FREECAD_AI.md file, if any
+    """
+    sections = []
+
     # Document context
-    doc_ctx = get_document_context()
-    if doc_ctx:
-        sections.append("## Current Document State")
-        sections.append(doc_ctx)
-        sections.append("")
+    doc_section = build_document_section()
+    if doc_section:
+        sections.append(doc_section)
 
     # Available skills
     try:
@@ -399,4 +421,39 @@ def build_system_prompt(mode: str = "plan", agents_md: str = "",
         sections.append(agents_md)
         sections.append("")
 
-    return "\n".join(sections)
+    return sections
+
+
+def build_request_block(mode: str = "plan", tools_enabled: bool = False,
+                        agents_md: str = "") -> str:
+    """Build the part of the prompt that follows the static block.
+
+    Holds the mode instructions and the context sections, which change
+    with the mode toggle and the active document.
+    """
+    return "\n".join([build_mode_section(mode, tools_enabled), ""]
+                     + build_context_sections(agents_md))
+
+
+def build_system_blocks(mode: str = "plan", agents_md: str = "",
+                        tools_enabled: bool = False) -> list[str]:
+    """Build the system prompt as [static block, request block].
+
+    Clients cache the first block and send the second after it.
+    """
+    return [
+        "\n".join(build_static_sections(tools_enabled)),
+        build_request_block(mode, tools_enabled, agents_md),
+    ]
+
+
+def build_system_prompt(mode: str = "plan", agents_md: str = "",
+                        tools_enabled: bool = False) -> str:
+    """Build the full system prompt.
+
+    Args:
+        mode: "plan" or "act"
+        agents_md: Contents of AGENTS.md / FREECAD_AI.md file, if any
+        tools_enabled: Whether tool calling is active (shorter prompt, no API ref)
+    """
+    return "\n".join(build_system_blocks(mode, agents_md, tools_enabled))
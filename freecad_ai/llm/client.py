@@ -11,6 +11,7 @@ import base64
 import json
 import random
 import ssl
+import threading
 import urllib.request
 import urllib.error
 from dataclasses import dataclass, field
@@ -21,6 +22,12 @@ from .providers import get_api_style
 # Anthropic API version header
 ANTHROPIC_API_VERSION = "2023-06-01"
 
+# Marks the end of a prompt prefix Anthropic may cache between requests
+CACHE_CONTROL = {"type": "ephemeral"}
+
+# Routes requests with the same prompt prefix to the same OpenAI cache
+PROMPT_CACHE_KEY = "freecad-ai"
+
 
 @dataclass
 class ToolCall:
@@ -127,25 +134,29 @@ class LLMClient:
         self.api_style = get_api_style(provider_name)
 
         # SSL context for HTTPS requests
-        self._ssl_ctx = ssl.create_default_context()
+        self._ssl_ctx = _ssl_context()
 
     # ── Public API ──────────────────────────────────────────────
 
-    def send(self, messages: list[dict], system: str = "") -> str:
-        """Send a non-streaming completion request. Returns the full response text."""
+    def send(self, messages: list[dict], system: str | list[str] = "") -> str:
+        """Send a non-streaming completion request. Returns the full response text.
+
+        system may be a string or a list of text blocks; with a list, the
+        first block is the prefix marked for prompt caching.
+        """
         if self.api_style == "anthropic":
             return self._send_anthropic(messages, system, stream=False)
         else:
             return self._send_openai(messages, system, stream=False)
 
-    def stream(self, messages: list[dict], system: str = "") -> Generator[str, None, None]:
+    def stream(self, messages: list[dict], system: str | list[str] = "") -> Generator[str, None, None]:
         """Send a streaming request. Yields text deltas as they arrive."""
         if self.api_style == "anthropic":
             yield from self._stream_anthropic(messages, system)
         else:
             yield from self._stream_openai(messages, system)
 
-    def send_with_tools(self, messages: list[dict], system: str = "",
+    def send_with_tools(self, messages: list[dict], system: str | list[str] = "",
                         tools: list[dict] | None = None) -> LLMResponse:
         """Send a non-streaming request with tool definitions. Returns full response."""
         if self.api_style == "anthropic":
@@ -153,7 +164,7 @@ class LLMClient:
         else:
             return self._send_openai_tools(messages, system, tools)
 
-    def stream_with_tools(self, messages: list[dict], system: str = "",
+    def stream_with_tools(self, messages: list[dict], system: str | list[str] = "",
                           tools: list[dict] | None = None) -> Generator[LLMStreamEvent, None, None]:
         """Send a streaming request with tool definitions. Yields LLMStreamEvents."""
         if self.api_style == "anthropic":
@@ -232,7 +243,7 @@ class LLMClient:
                      tools: list[dict] | None = None) -> dict:
         msgs = []
         if system:
-            sys_content = system
+            sys_content = system if isinstance(system, str) else "\n".join(system)
             # For Ollama: append /think or /no_think tags for models that support them
             # (models that don't will just ignore these as text)
             if self.provider_name == "ollama":
@@ -256,6 +267,9 @@ class LLMClient:
         elif self.thinking != "off":
             effort_map = {"on": "medium", "extended": "high"}
             body["reasoning_effort"] = effort_map.get(self.thinking, "medium")
+        # OpenAI caches repeated prefixes automatically; the key improves hits
+        if self.provider_name == "openai":
+            body["prompt_cache_key"] = PROMPT_CACHE_KEY
         return body
 
     def _send_openai(self, messages: list[dict], system: str, stream: bool = False) -> str:
@@ -310,7 +324,7 @@ class LLMClient:
     def _stream_openai_tools(self, messages: list[dict], system: str,
                              tools: list[dict] | None) -> Generator[LLMStreamEvent, None, None]:
         body = self._openai_body(messages, system, stream=True, tools=tools)
-        # Track in-progress tool calls: {index: {"id": ..., "name": ..., "arguments_json": ...}}
+        # Track in-progress tool calls: {index: {"id": ..., "name": ..., "arguments_parts": [...]}}
         pending_tools: dict[int, dict] = {}
 
         for chunk in self._http_stream(self._openai_url(), self._openai_headers(), body):
@@ -339,7 +353,7 @@ class LLMClient:
                         pending_tools[idx] = {
                             "id": tc_delta.get("id", ""),
                             "name": "",
-                            "arguments_json": "",
+                            "arguments_parts": [],
                         }
 
                     pt = pending_tools[idx]
@@ -356,14 +370,15 @@ class LLMClient:
 
                     arg_chunk = func.get("arguments", "")
                     if arg_chunk:
-                        pt["arguments_json"] += arg_chunk
+                        pt["arguments_parts"].append(arg_chunk)
                         yield LLMStreamEvent(type="tool_call_delta", argument_delta=arg_chunk)
 
                 # Finish
                 if finish == "tool_calls":
                     for idx, pt in sorted(pending_tools.items()):
+                        arguments_json = "".join(pt["arguments_parts"])
                         try:
-                            args = json.loads(pt["arguments_json"]) if pt["arguments_json"] else {}
+                            args = json.loads(arguments_json) if arguments_json else {}
                         except json.JSONDecodeError:
                             args = {}
                         yield LLMStreamEvent(
@@ -428,7 +443,7 @@ class LLMClient:
                         tools: list[dict] | None = None) -> dict:
         body = {
             "model": self.model,
-            "messages": messages,
+            "messages": self._with_cache_breakpoint(messages),
             "max_tokens": self.max_tokens,
             "stream": stream,
         }
@@ -443,12 +458,40 @@ class LLMClient:
             }
         else:
             body["temperature"] = self.temperature
-        if system:
-            body["system"] = system
+        # Cache breakpoints after the tools, the system prompt and the
+        # latest user turn, so each request reuses the previous prefix
+        # Only the first system block is cached; later blocks carry text that
+        # changes between requests (mode, document state)
+        blocks = [system] if isinstance(system, str) else [b for b in system if b]
+        if blocks and blocks[0]:
+            body["system"] = [
+                {"type": "text", "text": blocks[0], "cache_control": CACHE_CONTROL},
+            ] + [{"type": "text", "text": b} for b in blocks[1:]]
         if tools:
-            body["tools"] = tools
+            body["tools"] = tools[:-1] + [{**tools[-1], "cache_control": CACHE_CONTROL}]
         return body
 
+    @staticmethod
+    def _with_cache_breakpoint(messages: list[dict]) -> list[dict]:
+        """Return messages with a cache breakpoint on the last user turn.
+
+        The caller's message dicts are shared with the conversation's
+        caches, so the last one is copied rather than modified.
+        """
+        if not messages or messages[-1].get("role") != "user":
+            return messages
+        last = messages[-1]
+        content = last.get("content")
+        if isinstance(content, str):
+            if not content:
+                return messages
+            blocks = [{"type": "text", "text": content, "cache_control": CACHE_CONTROL}]
+        elif isinstance(content, list) and content:
+            blocks = content[:-1] + [{**content[-1], "cache_control": CACHE_CONTROL}]
+        else:
+            return messages
+        return messages[:-1] + [{**last, "content": blocks}]
+
     def _send_anthropic(self, messages: list[dict], system: str, stream: bool = False) -> str:
         body = self._anthropic_body(messages, system, stream=False)
         data = self._http_post(self._anthropic_url(), self._anthropic_headers(), body)
@@ -495,7 +538,7 @@ class LLMClient:
         # Track current tool call being streamed
         current_tool_id = ""
         current_tool_name = ""
-        current_tool_json = ""
+        current_tool_json = []  # partial_json chunks, joined at content_block_stop
 
         for chunk in self._http_stream(self._anthropic_url(), self._anthropic_headers(), body):
             event_type = chunk.get("type", "")
@@ -505,7 +548,7 @@ class LLMClient:
                 if block.get("type") == "tool_use":
                     current_tool_id = block.get("id", "")
                     current_tool_name = block.get("name", "")
-                    current_tool_json = ""
+                    current_tool_json = []
                     yield LLMStreamEvent(
                         type="tool_call_start",
                         tool_call=ToolCall(id=current_tool_id, name=current_tool_name, arguments={}),
@@ -524,13 +567,14 @@ class LLMClient:
                 elif delta.get("type") == "input_json_delta":
                     json_chunk = delta.get("partial_json", "")
                     if json_chunk:
-                        current_tool_json += json_chunk
+                        current_tool_json.append(json_chunk)
                         yield LLMStreamEvent(type="tool_call_delta", argument_delta=json_chunk)
 
             elif event_type == "content_block_stop":
                 if current_tool_name:
+                    tool_json = "".join(current_tool_json)
                     try:
-                        args = json.loads(current_tool_json) if current_tool_json else {}
+                        args = json.loads(tool_json) if tool_json else {}
                     except json.JSONDecodeError:
                         args = {}
                     yield LLMStreamEvent(
@@ -539,7 +583,7 @@ class LLMClient:
                     )
                     current_tool_name = ""
                     current_tool_id = ""
-                    current_tool_json = ""
+                    current_tool_json = []
 
             elif event_type == "message_stop":
                 yield LLMStreamEvent(type="done")
@@ -557,7 +601,7 @@ class LLMClient:
 
     def _http_post(self, url: str, headers: dict, body: dict) -> dict:
         """Make an HTTP POST request and return parsed JSON response."""
-        payload = json.dumps(body).encode("utf-8")
+        payload = _encode_body(body)
         req = urllib.request.Request(url, data=payload, headers=headers, method="POST")
         # Ollama may need extra time to load large models from disk
         timeout = 300 if self.provider_name == "ollama" else 120
@@ -580,7 +624,7 @@ class LLMClient:
 
     def _http_stream(self, url: str, headers: dict, body: dict) -> Generator[dict, None, None]:
         """Make a streaming HTTP POST and yield parsed SSE data chunks."""
-        payload = json.dumps(body).encode("utf-8")
+        payload = _encode_body(body)
         req = urllib.request.Request(url, data=payload, headers=headers, method="POST")
         # Ollama may need extra time to load large models from disk
         timeout = 300 if self.provider_name == "ollama" else 120
@@ -601,45 +645,103 @@ class LLMClient:
             raise LLMError(f"Request failed: {e}")
 
         try:
-            buffer = ""
+            # The response iterates line by line; only "data: " lines carry
+            # payloads (blank lines, ":" comments and Anthropic's "event:"
+            # lines are skipped). json.loads() decodes the UTF-8 bytes itself.
             for raw_line in resp:
-                line = raw_line.decode("utf-8")
-                buffer += line
-                # Process complete lines
-                while "\n" in buffer:
-                    text_line, buffer = buffer.split("\n", 1)
-                    text_line = text_line.strip()
-
-                    if not text_line:
-                        continue
-                    if text_line.startswith(":"):
-                        # SSE comment, skip
-                        continue
-                    if text_line == "data: [DONE]":
-                        return
-                    if text_line.startswith("event:"):
-                        # Anthropic uses event: lines but the data follows on next line
-                        continue
-                    if text_line.startswith("data: "):
-                        json_str = text_line[6:]
-                        try:
-                            yield json.loads(json_str)
-                        except json.JSONDecodeError:
-                            continue
+                line = raw_line.strip()
+                if not line.startswith(b"data: "):
+                    continue
+                if line == b"data: [DONE]":
+                    return
+                try:
+                    yield json.loads(line[6:])
+                except ValueError:
+                    continue
         finally:
             resp.close()
 
 
+_SSL_CTX = None
+
+# id(message) -> (message, JSON text) for _encode_body(), bounded by the
+# total length of the cached text (image messages carry base64 payloads).
+# Chat and compaction workers may encode at the same time, hence the lock.
+_message_json = {}
+_message_json_chars = 0
+_message_json_lock = threading.Lock()
+_MESSAGE_JSON_MAX_CHARS = 8_000_000
+
+
+def clear_message_cache():
+    """Drop the messages cached by _encode_body() (e.g. on a new chat)."""
+    global _message_json_chars
+    with _message_json_lock:
+        _message_json.clear()
+        _message_json_chars = 0
+
+
+def _encode_body(body: dict) -> bytes:
+    """Encode a request body as UTF-8 JSON, reusing encoded messages.
+
+    The conversation hands out the same dict for a message on every send,
+    so only messages added since the previous request are encoded; the
+    rest of the body is small. The last message is never cached, since
+    the Anthropic path sends a fresh copy of it with a cache breakpoint.
+    The result equals json.dumps(body) apart from key order.
+    """
+    global _message_json_chars
+    messages = body.get("messages")
+    if not messages:
+        return json.dumps(body).encode("utf-8")
+    parts = []
+    with _message_json_lock:
+        for msg in messages[:-1]:
+            cached = _message_json.get(id(msg))
+            if cached is None or cached[0] is not msg:
+                if cached is not None:
+                    _message_json_chars -= len(cached[1])
+                cached = (msg, json.dumps(msg))
+                if _message_json_chars + len(cached[1]) > _MESSAGE_JSON_MAX_CHARS:
+                    _message_json.clear()
+                    _message_json_chars = 0
+                _message_json[id(msg)] = cached
+                _message_json_chars += len(cached[1])
+            parts.append(cached[1])
+    parts.append(json.dumps(messages[-1]))
+    rest = json.dumps({k: v for k, v in body.items() if k != "messages"})
+    sep = ", " if len(rest) > 2 else ""
+    return ('{"messages": [' + ", ".join(parts) + "]" + sep + rest[1:]).encode("utf-8")
+
+# (settings, client) of the last create_client_from_config() call
+_cached_client = None
+
+
+def _ssl_context() -> ssl.SSLContext:
+    """Return the SSL context shared by all clients.
+
+    Loading the system CA bundle is slow, and the context is safe to use
+    from several threads, so it is created once per session.
+    """
+    global _SSL_CTX
+    if _SSL_CTX is None:
+        _SSL_CTX = ssl.create_default_context()
+    return _SSL_CTX
+
+
 def create_client_from_config() -> LLMClient:
-    """Create an LLMClient from the current application config."""
+    """Create an LLMClient from the current application config.
+
+    Clients hold no per-request state, so the previous one is returned
+    while the relevant settings are unchanged.
+    """
+    global _cached_client
     from ..config import get_config
     cfg = get_config()
-    return LLMClient(
-        provider_name=cfg.provider.name,
-        base_url=cfg.provider.base_url,
-        api_key=cfg.provider.api_key,
-        model=cfg.provider.model,
-        max_tokens=cfg.max_tokens,
-        temperature=cfg.temperature,
-        thinking=cfg.thinking,
+    settings = (
+        cfg.provider.name, cfg.provider.base_url, cfg.provider.api_key,
+        cfg.provider.model, cfg.max_tokens, cfg.temperature, cfg.thinking,
     )
+    if _cached_client is None or _cached_client[0] != settings:
+        _cached_client = (settings, LLMClient(*settings))
+    return _cached_client[1]
@@ -9,7 +9,10 @@ the worker implements an agentic loop: stream response, execute
 tool calls on the main thread, feed results back to the LLM.
 """
 
+import copy
 import json
+import threading
+import time
 
 from .compat import QtWidgets, QtCore, QtGui
 from ..i18n import translate
@@ -20,6 +23,8 @@ QVBoxLayout = QtWidgets.QVBoxLayout
 QHBoxLayout = QtWidgets.QHBoxLayout
 QTextBrowser = QtWidgets.QTextBrowser
 QTextEdit = QtWidgets.QTextEdit
+QPlainTextEdit = QtWidgets.QPlainTextEdit
+QSplitter = QtWidgets.QSplitter
 QPushButton = QtWidgets.QPushButton
 QComboBox = QtWidgets.QComboBox
 QLabel = QtWidgets.QLabel
@@ -34,10 +39,79 @@ QTextCursor = QtGui.QTextCursor
 from ..config import get_config, save_current_config
 from ..core.conversation import Conversation
 from ..core.executor import extract_code_blocks, execute_code
-from .message_view import render_message, render_code_block, render_execution_result, render_tool_call
+from .message_view import (
+    render_message, render_code_block, render_execution_result, render_tool_call,
+    clear_render_cache,
+)
 from .code_review_dialog import CodeReviewDialog
 
 
+# Opening markup for a streamed AI response; closed by "</div></div>"
+_AI_PRELUDE_HTML = (
+    '<div style="margin: 8px 0; padding: 8px 12px; '
+    'background-color: #f5f5f5; border-radius: 6px;">'
+    '<div style="font-weight: bold; color: #2e7d32; margin-bottom: 4px;">AI</div>'
+    '<div style="white-space: pre-wrap;">'
+)
+
+# Substrings that message_view renders as formatting (code, bold/italic, think)
+_MARKDOWN_MARKERS = ("`", "*", "<think>")
+
+# Messages laid out by a full rerender; older ones are behind a
+# "show earlier messages" link that extends the window by this much
+HISTORY_WINDOW = 200
+
+
+def _write_json_log(f, fields):
+    """Write a JSON object to *f*, streaming list fields item by item.
+
+    *fields* is a sequence of (key, value) or (key, value, encode_item)
+    pairs. Lists and iterators are serialized one element at a time so the
+    whole log never exists as a single object tree; the output matches
+    json.dump(..., indent=2). encode_item, if given, returns an element's
+    already-indented JSON (e.g. Conversation.message_json).
+    """
+    f.write("{")
+    sep = "\n  "
+    for key, value, *encoder in fields:
+        f.write(sep + json.dumps(key) + ": ")
+        sep = ",\n  "
+        if not isinstance(value, list) and not hasattr(value, "__next__"):
+            f.write(json.dumps(value, indent=2, default=str).replace("\n", "\n  "))
+            continue
+        f.write("[")
+        item_sep = "\n    "
+        for item in value:
+            f.write(item_sep)
+            if encoder:
+                f.write(encoder[0](item))
+            else:
+                f.write(json.dumps(item, indent=2, default=str).replace("\n", "\n    "))
+            item_sep = ",\n    "
+        f.write("]" if item_sep == "\n    " else "\n  ]")
+    f.write("\n}" if sep != "\n  " else "}")
+
+
+class _LogWriter(QtCore.QRunnable):
+    """Writes a JSON log file on a pool thread, replacing it atomically."""
+
+    def __init__(self, filepath, fields):
+        super().__init__()
+        self.filepath = filepath
+        self.fields = fields
+
+    def run(self):
+        import os
+        tmp_path = self.filepath + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.filepath), exist_ok=True)
+            with open(tmp_path, "w") as f:
+                _write_json_log(f, self.fields)
+            os.replace(tmp_path, self.filepath)
+        except Exception:
+            pass  # Don't disrupt the UI for auto-save failures
+
+
 # ── LLM Worker Thread ───────────────────────────────────────
 
 class _LLMWorker(QThread):
@@ -50,17 +124,17 @@ class _LLMWorker(QThread):
       4. Append results to messages, loop back to step 1
     """
 
-    token_received = Signal(str)           # Text delta
-    thinking_received = Signal(str)        # Thinking/reasoning delta
+    stream_ready = Signal()                # Deltas queued; collect with take_stream()
     response_finished = Signal(str)        # Full response text (final turn only)
     error_occurred = Signal(str)           # Error message
     tool_call_started = Signal(str, str)   # (tool_name, call_id)
     tool_call_finished = Signal(str, str, bool, str)  # (tool_name, call_id, success, output)
-    tool_exec_requested = Signal(str, str) # (tool_name, arguments_json) — dispatches to main thread
+    tool_exec_requested = Signal(str, object)  # (tool_name, arguments) — dispatches to main thread
     vision_note = Signal(str)              # Vision description status note
 
     def __init__(self, messages, system_prompt, tools=None, registry=None,
-                 api_style="openai", conversation=None, describe_fn=None, parent=None):
+                 api_style="openai", conversation=None, describe_fn=None,
+                 token_budget=None, parent=None):
         super().__init__(parent)
         self.messages = list(messages)
         self.system_prompt = system_prompt
@@ -69,13 +143,30 @@ class _LLMWorker(QThread):
         self.api_style = api_style
         self.conversation = conversation
         self.describe_fn = describe_fn
-        self._full_response = ""
-        self._thinking_text = ""
+        self.token_budget = token_budget
+        self._full_response_parts = []
+        self._thinking_parts = []
         self._tool_results = []
-        self._tool_result_ready = QtCore.QMutex()
-        self._tool_result_wait = QtCore.QWaitCondition()
+        self._pre_final_len = 0  # Length of _full_response before the final turn
+        self._result_sem = QtCore.QSemaphore(0)
         self._pending_result = None
         self._max_tool_turns = 30  # Safety limit
+        # Text and thinking deltas wait here, in order, until the main
+        # thread's display timer collects them with take_stream()
+        self._stream_lock = threading.Lock()
+        self._stream_items = []  # (kind, parts); kind is "text" or "thinking"
+        # Message builders for the provider's wire format, chosen once
+        if api_style == "anthropic":
+            self._build_assistant_msg = self._build_assistant_msg_anthropic
+            self._build_tool_result_msg = self._build_tool_result_msg_anthropic
+        else:
+            self._build_assistant_msg = self._build_assistant_msg_openai
+            self._build_tool_result_msg = self._build_tool_result_msg_openai
+
+    @property
+    def _full_response(self):
+        """The response text streamed so far, across all turns."""
+        return "".join(self._full_response_parts)
 
     def run(self):
         try:
@@ -86,7 +177,8 @@ class _LLMWorker(QThread):
             if self.conversation and self.describe_fn:
                 wrapped = self._wrap_describe_fn(self.describe_fn)
                 self.messages = self.conversation.get_messages_for_api(
-                    api_style=self.api_style, describe_fn=wrapped
+                    api_style=self.api_style, describe_fn=wrapped,
+                    token_budget=self.token_budget,
                 )
 
             if not self.tools:
@@ -100,6 +192,27 @@ class _LLMWorker(QThread):
         except Exception as e:
             self.error_occurred.emit(str(e))
 
+    def _queue_delta(self, kind, text):
+        """Queue a streamed delta; signal the main thread if the queue was empty."""
+        with self._stream_lock:
+            items = self._stream_items
+            if items and items[-1][0] == kind:
+                items[-1][1].append(text)
+                return
+            items.append((kind, [text]))
+            notify = len(items) == 1
+        if notify:
+            self.stream_ready.emit()
+
+    def take_stream(self):
+        """Return and clear the queued deltas as (kind, text) pairs, in order.
+
+        Called on the main thread.
+        """
+        with self._stream_lock:
+            items, self._stream_items = self._stream_items, []
+        return [(kind, "".join(parts)) for kind, parts in items]
+
     def _wrap_describe_fn(self, describe_fn):
         """Wrap describe_fn to emit vision_note signals."""
         def wrapped(b64_data):
@@ -115,8 +228,8 @@ class _LLMWorker(QThread):
     def _simple_stream(self, client):
         """Stream without tools (original behavior)."""
         for chunk in client.stream(self.messages, system=self.system_prompt):
-            self._full_response += chunk
-            self.token_received.emit(chunk)
+            self._full_response_parts.append(chunk)
+            self._queue_delta("text", chunk)
         self.response_finished.emit(self._full_response)
 
     def _tool_loop(self, client):
@@ -124,7 +237,7 @@ class _LLMWorker(QThread):
         messages = list(self.messages)
 
         for turn in range(self._max_tool_turns):
-            text_parts = []
+            turn_start = len(self._full_response_parts)
             tool_calls = []
 
             # Stream with tools
@@ -132,12 +245,11 @@ class _LLMWorker(QThread):
                 messages, system=self.system_prompt, tools=self.tools
             ):
                 if event.type == "text_delta":
-                    text_parts.append(event.text)
-                    self._full_response += event.text
-                    self.token_received.emit(event.text)
+                    self._full_response_parts.append(event.text)
+                    self._queue_delta("text", event.text)
                 elif event.type == "thinking_delta":
-                    self._thinking_text += event.text
-                    self.thinking_received.emit(event.text)
+                    self._thinking_parts.append(event.text)
+                    self._queue_delta("thinking", event.text)
                 elif event.type == "tool_call_start":
                     if event.tool_call:
                         self.tool_call_started.emit(event.tool_call.name, event.tool_call.id)
@@ -147,7 +259,7 @@ class _LLMWorker(QThread):
                 elif event.type == "done":
                     break
 
-            turn_text = "".join(text_parts)
+            turn_text = "".join(self._full_response_parts[turn_start:])
 
             if not tool_calls:
                 # No tool calls — we're done
@@ -161,41 +273,14 @@ class _LLMWorker(QThread):
             ]
 
             # Add assistant message to local messages for next turn
-            if self.api_style == "anthropic":
-                content_blocks = []
-                if turn_text:
-                    content_blocks.append({"type": "text", "text": turn_text})
-                for tc in tool_calls:
-                    content_blocks.append({
-                        "type": "tool_use",
-                        "id": tc.id,
-                        "name": tc.name,
-                        "input": tc.arguments,
-                    })
-                messages.append({"role": "assistant", "content": content_blocks})
-            else:
-                oai_tcs = [
-                    {
-                        "id": tc.id,
-                        "type": "function",
-                        "function": {
-                            "name": tc.name,
-                            "arguments": json.dumps(tc.arguments),
-                        },
-                    }
-                    for tc in tool_calls
-                ]
-                messages.append({
-                    "role": "assistant",
-                    "content": turn_text or None,
-                    "tool_calls": oai_tcs,
-                })
+            messages.append(self._build_assistant_msg(turn_text, tc_dicts))
 
             # Execute each tool call on the main thread
             # Exception: optimize_iteration runs on worker thread (long-running
             # LLM calls would freeze the UI if dispatched to main thread).
             # Its inner tool calls dispatch to main thread via QtMainThreadToolExecutor.
             tool_result_messages = []
+            results = []
             for tc in tool_calls:
                 # Pre-tool-use hook
                 from ..hooks import fire_hook as _fire_hook
@@ -229,71 +314,109 @@ class _LLMWorker(QThread):
                     "turn": turn,
                 })
 
-                if self.api_style == "anthropic":
-                    tool_result_messages.append({
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "tool_result",
-                                "tool_use_id": tc.id,
-                                "content": result_text,
-                            }
-                        ],
-                    })
-                else:
-                    tool_result_messages.append({
-                        "role": "tool",
-                        "tool_call_id": tc.id,
-                        "content": result_text,
-                    })
+                results.append({"tool_call_id": tc.id, "content": result_text})
+                tool_result_messages.append(
+                    self._build_tool_result_msg(tc.id, result_text))
 
             messages.extend(tool_result_messages)
+            self._pre_final_len += len(turn_text)
 
             # Store tool call info so the parent can update the conversation
             self._tool_results.append({
                 "assistant_text": turn_text,
                 "tool_calls": tc_dicts,
-                "results": [
-                    {"tool_call_id": tc.id, "content": r["content"] if self.api_style != "anthropic" else r["content"][0]["content"]}
-                    for tc, r in zip(tool_calls, tool_result_messages)
-                ],
+                "results": results,
             })
 
         # If we reach here, we hit the max turns limit
         limit_msg = "\n\n[{}]".format(
             translate("ChatDockWidget", "Reached maximum tool call iterations"))
-        self._full_response += limit_msg
-        self.token_received.emit(limit_msg)
+        self._full_response_parts.append(limit_msg)
+        self._queue_delta("text", limit_msg)
         self.response_finished.emit(self._full_response)
 
+    @staticmethod
+    def _build_assistant_msg_anthropic(turn_text, tc_dicts):
+        """Build an Anthropic assistant message with tool_use blocks."""
+        content_blocks = []
+        if turn_text:
+            content_blocks.append({"type": "text", "text": turn_text})
+        for tcd in tc_dicts:
+            content_blocks.append({
+                "type": "tool_use",
+                "id": tcd["id"],
+                "name": tcd["name"],
+                "input": tcd["arguments"],
+            })
+        return {"role": "assistant", "content": content_blocks}
+
+    @staticmethod
+    def _build_assistant_msg_openai(turn_text, tc_dicts):
+        """Build an OpenAI assistant message with tool_calls."""
+        return {
+            "role": "assistant",
+            "content": turn_text or None,
+            "tool_calls": [
+                {
+                    "id": tcd["id"],
+                    "type": "function",
+                    "function": {
+                        "name": tcd["name"],
+                        "arguments": json.dumps(tcd["arguments"]),
+                    },
+                }
+                for tcd in tc_dicts
+            ],
+        }
+
+    @staticmethod
+    def _build_tool_result_msg_anthropic(call_id, result_text):
+        """Build an Anthropic tool_result message (sent as a user turn)."""
+        return {
+            "role": "user",
+            "content": [
+                {
+                    "type": "tool_result",
+                    "tool_use_id": call_id,
+                    "content": result_text,
+                }
+            ],
+        }
+
+    @staticmethod
+    def _build_tool_result_msg_openai(call_id, result_text):
+        """Build an OpenAI tool result message."""
+        return {
+            "role": "tool",
+            "tool_call_id": call_id,
+            "content": result_text,
+        }
+
     def _execute_tool_on_main_thread(self, tool_name: str, arguments: dict) -> dict:
         """Dispatch tool execution to the main thread and wait for the result.
 
         Emits tool_exec_requested signal (runs slot on main thread via
-        Qt.QueuedConnection), then blocks on a mutex until the main thread
+        Qt.QueuedConnection), then blocks on a semaphore until the main thread
         calls set_tool_result().
         """
+        # Drop a permit left behind by a result that arrived after a timeout
+        while self._result_sem.tryAcquire(1):
+            pass
         self._pending_result = None
-        self.tool_exec_requested.emit(tool_name, json.dumps(arguments))
-
-        # Wait for result with timeout (30s) to avoid deadlock
-        self._tool_result_ready.lock()
-        deadline = 300000  # ms (5 min, for interactive tools like select_geometry)
-        while self._pending_result is None:
-            if not self._tool_result_wait.wait(self._tool_result_ready, deadline):
-                # Timed out
-                self._tool_result_ready.unlock()
-                return {"success": False, "output": "", "error": "Tool execution timed out (main thread did not respond)"}
-        self._tool_result_ready.unlock()
+        # The main thread gets its own copy; no JSON round-trip needed
+        self.tool_exec_requested.emit(tool_name, copy.deepcopy(arguments))
+
+        # Wait for result with timeout to avoid deadlock
+        timeout = 300000  # ms (5 min, for interactive tools like select_geometry)
+        if not self._result_sem.tryAcquire(1, timeout):
+            return {"success": False, "output": "", "error": "Tool execution timed out (main thread did not respond)"}
 
         return self._pending_result
 
     def set_tool_result(self, result: dict):
         """Called from the main thread to provide a tool execution result."""
-        self._tool_result_ready.lock()
         self._pending_result = result
-        self._tool_result_wait.wakeAll()
-        self._tool_result_ready.unlock()
+        self._result_sem.release(1)
 
 
 class _CompactionWorker(QThread):
@@ -512,7 +635,6 @@ class ChatDockWidget(QDockWidget):
 
         self.conversation = Conversation()
         self._worker = None
-        self._streaming_html = ""
         self._retry_count = 0
         self._anchor_connected = False
         self._tool_registry = None
@@ -529,6 +651,56 @@ class ChatDockWidget(QDockWidget):
         get_hook_registry()
 
         self._build_ui()
+
+        self._loading = False
+
+        # Streamed tokens are queued and inserted once per frame (~30 Hz)
+        # instead of re-parsing an HTML fragment for every delta.
+        self._pending_tokens = []
+        self._pending_thinking = []
+        self._stream_run_parts = []  # Text shown in the streaming pane
+        self._token_format = QtGui.QTextCharFormat()
+        self._token_flush_timer = QtCore.QTimer(self)
+        self._token_flush_timer.setSingleShot(True)
+        self._token_flush_timer.setInterval(33)
+        self._token_flush_timer.timeout.connect(self._on_stream_timer)
+        self._token_count_timer = QtCore.QTimer(self)
+        self._token_count_timer.setSingleShot(True)
+        self._token_count_timer.setInterval(0)
+        self._token_count_timer.timeout.connect(self._refresh_token_count)
+
+        # (text, blocks) of the last extract_code_blocks() call; the final
+        # response is scanned by both the rerender and the Act-mode handler
+        self._last_code_blocks = (None, [])
+
+        # id(message) -> (message, mode, html, plan codes) for _rerender_chat;
+        # mode is None for messages without Plan-mode buttons, which render
+        # the same in both modes; plan codes are the code blocks with buttons
+        self._render_cache = {}
+        # Set when a rerender was requested while a response was streaming
+        self._rerender_pending = False
+        # Plan-mode Execute/Copy links carry a small id ("execute:3") that maps
+        # back to the code block; ids are stable per distinct code string, and
+        # codes no longer on screen are dropped by _rerender_chat
+        self._plan_code_by_id = {}
+        self._plan_id_by_code = {}
+        self._plan_next_id = 0
+        # tool call id -> (arguments, indented JSON) for rendered tool calls
+        self._tool_args_text = {}
+        # Number of most recent messages a full rerender shows
+        self._history_window = HISTORY_WINDOW
+        # Messages before this index are shown in the chat display;
+        # _stream_start_pos is where the current response's output begins
+        self._last_rendered_index = 0
+        self._stream_start_pos = None
+
+        # Static block of the system prompt, keyed by tools_enabled
+        self._cached_system_prompt = None
+
+        # Auto-save logs are written off the GUI thread, one at a time
+        self._log_pool = QtCore.QThreadPool(self)
+        self._log_pool.setMaxThreadCount(1)
+
         self._ensure_vision_fallback()
         self._refresh_image_controls()
 
@@ -581,7 +753,37 @@ class ChatDockWidget(QDockWidget):
             "QTextBrowser { border: 1px solid #ccc; background-color: #ffffff; }"
         )
         self.chat_display.anchorClicked.connect(self._handle_anchor_click)
-        layout.addWidget(self.chat_display, 1)
+        self._chat_cursor = QTextCursor(self.chat_display.document())
+        # Follow new output only while the history is scrolled to the end;
+        # scrolling up to read keeps the position until the user returns
+        self._chat_follow = True
+        self._chat_scroll_pending = False
+        self.chat_display.verticalScrollBar().valueChanged.connect(
+            self._on_chat_scrolled)
+
+        # ── Streaming pane ──
+        # The response being streamed goes into a plain-text view, which
+        # avoids rich-text layout per token. Its text is committed to the
+        # history above at tool/thinking boundaries and when the turn ends.
+        self.stream_display = QPlainTextEdit()
+        self.stream_display.setReadOnly(True)
+        self.stream_display.setFont(QFont("Sans", 10))
+        self.stream_display.setMaximumBlockCount(1000)
+        self.stream_display.setStyleSheet(
+            "QPlainTextEdit { border: 1px solid #ccc; background-color: #f5f5f5; }"
+        )
+        self.stream_display.hide()
+        # Insertion point for streamed text; stays at the end of the pane
+        # (and survives clear()), so it is created once and reused
+        self._stream_cursor = QTextCursor(self.stream_display.document())
+
+        chat_splitter = QSplitter(Qt.Vertical)
+        chat_splitter.setChildrenCollapsible(False)
+        chat_splitter.addWidget(self.chat_display)
+        chat_splitter.addWidget(self.stream_display)
+        chat_splitter.setStretchFactor(0, 3)
+        chat_splitter.setStretchFactor(1, 1)
+        layout.addWidget(chat_splitter, 1)
 
         # ── Attachment strip ──
         self._attachment_strip = _AttachmentStrip()
@@ -724,6 +926,7 @@ class ChatDockWidget(QDockWidget):
         # Add to conversation and display
         self.conversation.add_user_message(text, images=images)
         display_content = self.conversation.messages[-1]["content"]
+        self._chat_follow = True  # sending jumps back to the latest output
         self._append_html(render_message("user", display_content))
         self._attachment_strip.clear()
 
@@ -794,6 +997,9 @@ class ChatDockWidget(QDockWidget):
         cfg = get_config()
         cfg.mode = "plan" if index == 0 else "act"
         save_current_config()
+        # Only messages with Plan-mode Execute/Copy buttons depend on the mode
+        if any(entry[1] is not None for entry in self._render_cache.values()):
+            self._request_rerender()
 
     def _ensure_vision_fallback(self):
         """Connect non-deferred MCP servers and search for a vision fallback.
@@ -863,6 +1069,7 @@ class ChatDockWidget(QDockWidget):
         dlg = SettingsDialog(parent)
         dlg.exec()
         # Refresh after settings may have changed
+        self._cached_system_prompt = None
         cfg = get_config()
         if cfg.provider.name != old_provider or cfg.provider.model != old_model:
             self._vision_fallback_tool = None
@@ -887,6 +1094,23 @@ class ChatDockWidget(QDockWidget):
             self.conversation.save()
 
         self.conversation = Conversation()
+        self._cached_system_prompt = None
+        self._render_cache.clear()
+        clear_render_cache()
+        from ..llm.client import clear_message_cache
+        clear_message_cache()
+        self._plan_code_by_id.clear()
+        self._plan_id_by_code.clear()
+        self._plan_next_id = 0
+        self._tool_args_text.clear()
+        self._history_window = HISTORY_WINDOW
+        self._last_rendered_index = 0
+        self._stream_start_pos = None
+        self._pending_tokens.clear()
+        self._pending_thinking.clear()
+        self._stream_run_parts.clear()
+        self.stream_display.clear()
+        self.stream_display.hide()
         self.chat_display.clear()
         self._update_token_count()
 
@@ -944,6 +1168,9 @@ class ChatDockWidget(QDockWidget):
             # Load the selected conversation
             try:
                 self.conversation = Conversation.load(conv_id)
+                from ..llm.client import clear_message_cache
+                clear_message_cache()
+                self._history_window = HISTORY_WINDOW
                 self._rerender_chat()
                 self._update_token_count()
                 self._append_html(render_message(
@@ -977,27 +1204,7 @@ class ChatDockWidget(QDockWidget):
             return
 
         # Build a text summary of older messages for the LLM to compress
-        summary_parts = []
-        for msg in older:
-            role = msg["role"]
-            content = msg.get("content", "")
-            if role == "tool_result":
-                # Truncate long tool results for the summary request
-                if len(content) > 500:
-                    content = content[:500] + "..."
-                summary_parts.append(f"[Tool Result] {content}")
-            elif role == "assistant" and msg.get("tool_calls"):
-                tc_names = [tc["name"] for tc in msg["tool_calls"]]
-                summary_parts.append(f"[Assistant] Called tools: {', '.join(tc_names)}")
-                if content:
-                    summary_parts.append(f"  Text: {content[:300]}")
-            else:
-                label = "User" if role == "user" else "Assistant" if role == "assistant" else "System"
-                if len(content) > 500:
-                    content = content[:500] + "..."
-                summary_parts.append(f"[{label}] {content}")
-
-        summary_text = "\n".join(summary_parts)
+        summary_text = Conversation.digest(older)
 
         # Use a background thread to generate the summary
         self._set_loading(True)
@@ -1024,7 +1231,6 @@ class ChatDockWidget(QDockWidget):
 
     def _continue_send(self):
         """Continue the send flow after optional compaction."""
-        from ..core.system_prompt import build_system_prompt
         mode = "plan" if self.mode_combo.currentIndex() == 0 else "act"
         cfg = get_config()
 
@@ -1083,10 +1289,10 @@ class ChatDockWidget(QDockWidget):
                 tools_schema = self._tool_registry.to_anthropic_schema()
             else:
                 tools_schema = self._tool_registry.to_openai_schema()
-            system_prompt = build_system_prompt(mode=mode, tools_enabled=True)
+            system_prompt = self._get_system_prompt(mode, tools_enabled=True)
         else:
             self._tool_registry = None
-            system_prompt = build_system_prompt(mode=mode)
+            system_prompt = self._get_system_prompt(mode)
 
         # Build describe_fn for non-vision LLMs
         describe_fn = None
@@ -1108,18 +1314,13 @@ class ChatDockWidget(QDockWidget):
                 describe_fn = _make_describe(_reg, _tool)
                 conversation_ref = self.conversation
 
-        # Get messages for API
-        messages = self.conversation.get_messages_for_api(api_style=api_style)
+        # Get messages for API; older history is condensed near the budget
+        messages = self.conversation.get_messages_for_api(
+            api_style=api_style, token_budget=cfg.context_window)
 
         # Start streaming
         self._set_loading(True)
-        self._streaming_html = ""
-        self._append_html(
-            '<div style="margin: 8px 0; padding: 8px 12px; '
-            'background-color: #f5f5f5; border-radius: 6px;">'
-            '<div style="font-weight: bold; color: #2e7d32; margin-bottom: 4px;">AI</div>'
-            '<div style="white-space: pre-wrap;">'
-        )
+        self._begin_response_display()
 
         self._in_thinking = False
         self._tool_results_stored = False
@@ -1127,10 +1328,9 @@ class ChatDockWidget(QDockWidget):
             messages, system_prompt,
             tools=tools_schema, registry=self._tool_registry,
             api_style=api_style, conversation=conversation_ref,
-            describe_fn=describe_fn, parent=self,
+            describe_fn=describe_fn, token_budget=cfg.context_window, parent=self,
         )
-        self._worker.token_received.connect(self._on_token)
-        self._worker.thinking_received.connect(self._on_thinking)
+        self._worker.stream_ready.connect(self._on_stream_ready)
         self._worker.response_finished.connect(self._on_response_finished)
         self._worker.error_occurred.connect(self._on_error)
         self._worker.tool_call_started.connect(self._on_tool_call_started)
@@ -1139,6 +1339,20 @@ class ChatDockWidget(QDockWidget):
         self._worker.vision_note.connect(self._on_vision_note)
         self._worker.start()
 
+    def _get_system_prompt(self, mode, tools_enabled=False):
+        """Return the system prompt for a request as [static, request] blocks.
+
+        The static block only changes with the settings, so it is built once
+        and reused, and the client marks it for prompt caching; the mode,
+        document state, skills and AGENTS.md follow in the request block,
+        rebuilt on every call.
+        """
+        from ..core.system_prompt import build_static_sections, build_request_block
+        if self._cached_system_prompt is None or self._cached_system_prompt[0] != tools_enabled:
+            self._cached_system_prompt = (
+                tools_enabled, "\n".join(build_static_sections(tools_enabled)))
+        return [self._cached_system_prompt[1], build_request_block(mode, tools_enabled)]
+
     def _save_session_log(self):
         """Save the current session log as JSON for debugging."""
         import os
@@ -1149,29 +1363,19 @@ class ChatDockWidget(QDockWidget):
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filepath = os.path.join(log_dir, f"session_{timestamp}.json")
 
-        # Build the log from conversation messages
-        log_data = {
-            "timestamp": datetime.now().isoformat(),
-            "messages": [],
-        }
-
-        for msg in self.conversation.messages:
-            entry = {"role": msg["role"]}
-            if "content" in msg and msg["content"]:
-                entry["content"] = msg["content"]
-            if "tool_calls" in msg:
-                entry["tool_calls"] = msg["tool_calls"]
-            if "tool_call_id" in msg:
-                entry["tool_call_id"] = msg["tool_call_id"]
-            log_data["messages"].append(entry)
+        # Build the log from conversation messages, reusing their cached JSON
+        fields = [
+            ("timestamp", datetime.now().isoformat()),
+            ("messages", self.conversation.messages, self.conversation.message_json),
+        ]
 
         # Also include the last worker's tool results if available
         if self._worker and hasattr(self._worker, "_tool_results") and self._worker._tool_results:
-            log_data["tool_trace"] = self._worker._tool_results
+            fields.append(("tool_trace", self._worker._tool_results))
 
         try:
             with open(filepath, "w") as f:
-                json.dump(log_data, f, indent=2, default=str)
+                _write_json_log(f, fields)
 
             self._append_html(render_message(
                 "system",
@@ -1184,52 +1388,68 @@ class ChatDockWidget(QDockWidget):
             ))
 
     def _auto_save_log(self):
-        """Auto-save tool trace after each tool-using response."""
+        """Auto-save tool trace after each tool-using response (written on a pool thread)."""
         import os
         from datetime import datetime
 
         log_dir = os.path.expanduser("~/.config/FreeCAD/FreeCADAI/logs")
-        os.makedirs(log_dir, exist_ok=True)
-
         filepath = os.path.join(log_dir, "latest_session.json")
 
-        log_data = {
-            "timestamp": datetime.now().isoformat(),
-            "tool_trace": [],
-        }
-
+        # Snapshot the turn list; the generator below runs on the pool thread
+        tool_results = []
         if self._worker and hasattr(self._worker, "_tool_results"):
-            for turn_idx, turn in enumerate(self._worker._tool_results):
-                turn_data = {
+            tool_results = list(self._worker._tool_results)
+
+        def turns():
+            for turn_idx, turn in enumerate(tool_results):
+                yield {
                     "turn": turn_idx + 1,
                     "assistant_text": turn["assistant_text"],
-                    "tool_calls": [],
+                    "tool_calls": [
+                        {
+                            "name": tc["name"],
+                            "arguments": tc["arguments"],
+                            "result": result["content"],
+                        }
+                        for tc, result in zip(turn["tool_calls"], turn["results"])
+                    ],
                 }
-                for tc, result in zip(turn["tool_calls"], turn["results"]):
-                    turn_data["tool_calls"].append({
-                        "name": tc["name"],
-                        "arguments": tc["arguments"],
-                        "result": result["content"],
-                    })
-                log_data["tool_trace"].append(turn_data)
 
-        try:
-            with open(filepath, "w") as f:
-                json.dump(log_data, f, indent=2, default=str)
-        except Exception:
-            pass  # Don't disrupt the UI for auto-save failures
+        self._log_pool.start(_LogWriter(filepath, [
+            ("timestamp", datetime.now().isoformat()),
+            ("tool_trace", turns()),
+        ]))
 
     # ── Streaming handlers ──────────────────────────────────
 
-    @Slot(str)
+    @Slot()
+    def _on_stream_ready(self):
+        """The worker queued deltas — collect them on the next display flush."""
+        if not self._token_flush_timer.isActive():
+            self._token_flush_timer.start()
+
+    def _take_stream(self):
+        """Move the worker's queued deltas into the display queues, in order."""
+        if self._worker is None:
+            return
+        for kind, text in self._worker.take_stream():
+            if kind == "text":
+                self._on_token(text)
+            else:
+                self._on_thinking(text)
+
+    def _on_stream_timer(self):
+        """Collect the worker's deltas and write them, once per frame."""
+        self._take_stream()
+        self._flush_tokens()
+
     def _on_thinking(self, chunk):
-        """Handle a thinking/reasoning delta — render dimmed."""
-        import html as html_mod
+        """Handle a thinking/reasoning delta — render dimmed on the next flush."""
         if not self._in_thinking:
+            self._commit_stream()
             self._in_thinking = True
             # Start a thinking block
-            cursor = self.chat_display.textCursor()
-            cursor.movePosition(QTextCursor.End)
+            cursor = self._chat_end_cursor()
             cursor.insertHtml(
                 '<div style="margin: 4px 0; padding: 4px 8px; '
                 'background-color: #f0f0f0; border-left: 2px solid #ccc; '
@@ -1237,39 +1457,70 @@ class ChatDockWidget(QDockWidget):
                 '<span style="color: #aaa;">{}</span><br>'.format(
                     translate("ChatDockWidget", "Thinking..."))
             )
-            self.chat_display.setTextCursor(cursor)
 
-        escaped = html_mod.escape(chunk)
+        self._pending_thinking.append(chunk)
+        if not self._token_flush_timer.isActive():
+            self._token_flush_timer.start()
+
+    def _flush_thinking(self):
+        """Insert all queued thinking deltas into the open thinking block."""
+        import html as html_mod
+        text = "".join(self._pending_thinking)
+        self._pending_thinking.clear()
+        escaped = html_mod.escape(text)
         escaped = escaped.replace("\n", "<br>")
 
-        cursor = self.chat_display.textCursor()
-        cursor.movePosition(QTextCursor.End)
+        cursor = self._chat_end_cursor()
         cursor.insertHtml(f'<span style="color: #999; font-size: 11px;">{escaped}</span>')
-        self.chat_display.setTextCursor(cursor)
-        self.chat_display.ensureCursorVisible()
+        self._scroll_chat_to_bottom()
 
-    @Slot(str)
     def _on_token(self, chunk):
-        """Handle a streamed token — append to the display."""
-        import html as html_mod
-
+        """Handle a streamed token — queue it for the next display flush."""
         # Close thinking block if transitioning from thinking to regular content
         if self._in_thinking:
             self._in_thinking = False
-            cursor = self.chat_display.textCursor()
-            cursor.movePosition(QTextCursor.End)
+            if self._pending_thinking:
+                self._flush_thinking()
+            cursor = self._chat_end_cursor()
             cursor.insertHtml('</div>')
-            self.chat_display.setTextCursor(cursor)
 
-        escaped = html_mod.escape(chunk)
-        escaped = escaped.replace("\n", "<br>")
-        self._streaming_html += chunk
+        self._pending_tokens.append(chunk)
+        if not self._token_flush_timer.isActive():
+            self._token_flush_timer.start()
+
+    def _flush_tokens(self):
+        """Write queued deltas: thinking into the history, tokens into the pane.
 
-        cursor = self.chat_display.textCursor()
-        cursor.movePosition(QTextCursor.End)
-        cursor.insertHtml(escaped)
-        self.chat_display.setTextCursor(cursor)
-        self.chat_display.ensureCursorVisible()
+        Runs at most once per frame, so scrolling happens once per batch.
+        """
+        self._token_flush_timer.stop()
+        if self._pending_thinking:
+            self._flush_thinking()
+        if not self._pending_tokens:
+            return
+        text = "".join(self._pending_tokens)
+        self._pending_tokens.clear()
+        self._stream_run_parts.append(text)
+
+        self._stream_cursor.insertText(text)
+        scrollbar = self.stream_display.verticalScrollBar()
+        scrollbar.setValue(scrollbar.maximum())
+
+    def _commit_stream(self):
+        """Move the text streamed so far from the pane into the chat history.
+
+        Inserted as plain text in a single edit; markdown formatting is
+        applied by the rerender when the response finishes.
+        """
+        self._flush_tokens()
+        if not self._stream_run_parts:
+            return
+        text = "".join(self._stream_run_parts)
+        self._stream_run_parts.clear()
+        self.stream_display.clear()
+
+        cursor = self._chat_end_cursor()
+        cursor.insertText(text, self._token_format)
 
     def _store_tool_results(self, full_response=""):
         """Store tool results from worker into conversation. Idempotent — skips if already stored."""
@@ -1293,9 +1544,7 @@ class ChatDockWidget(QDockWidget):
                     self.conversation.add_tool_result(r["tool_call_id"], r["content"])
             # Store the final text-only response
             # Extract just the final part (after last tool round)
-            last_tool_end = sum(
-                len(t["assistant_text"]) for t in self._worker._tool_results
-            )
+            last_tool_end = self._worker._pre_final_len
             final_text = full_response[last_tool_end:] if last_tool_end < len(full_response) else full_response
             if final_text.strip():
                 self.conversation.add_assistant_message(final_text)
@@ -1313,10 +1562,12 @@ class ChatDockWidget(QDockWidget):
     def _on_response_finished(self, full_response):
         """Handle completion of LLM response."""
         self._set_loading(False)
+        self._take_stream()
+        self._commit_stream()
+        self.stream_display.hide()
 
         # Close the streaming div
-        cursor = self.chat_display.textCursor()
-        cursor.movePosition(QTextCursor.End)
+        cursor = self._chat_end_cursor()
         cursor.insertHtml("</div></div>")
 
         # Store in conversation - include any tool call info from the worker
@@ -1339,13 +1590,20 @@ class ChatDockWidget(QDockWidget):
         if self._worker and self._worker._tool_results:
             self._auto_save_log()
 
-        # Re-render the full chat to get proper code block formatting
-        self._rerender_chat()
+        # Replace the streamed text with the formatted new messages.
+        # Plain prose is already shown correctly by the streamed text, so
+        # this is only needed for markdown or tool call indicators.
+        if (self._worker and self._worker._tool_results) or any(
+                marker in full_response for marker in _MARKDOWN_MARKERS):
+            self._render_pending_messages()
+        else:
+            self._last_rendered_index = len(self.conversation.messages)
+        self._run_pending_rerender()
 
         # Handle code execution based on mode (only if tools were NOT used)
         mode = "plan" if self.mode_combo.currentIndex() == 0 else "act"
         if not (self._worker and self._worker._tool_results):
-            code_blocks = extract_code_blocks(full_response)
+            code_blocks = self._extract_code_blocks(full_response)
             if code_blocks and mode == "act":
                 self._handle_act_mode(code_blocks)
 
@@ -1364,10 +1622,12 @@ class ChatDockWidget(QDockWidget):
         without re-rendering (to keep the streaming HTML intact).
         """
         self._set_loading(False)
+        self._take_stream()
+        self._commit_stream()
+        self.stream_display.hide()
 
         # Close the streaming div
-        cursor = self.chat_display.textCursor()
-        cursor.movePosition(QTextCursor.End)
+        cursor = self._chat_end_cursor()
         cursor.insertHtml("</div></div>")
 
         # Store any tool results that were collected before the error
@@ -1401,12 +1661,16 @@ class ChatDockWidget(QDockWidget):
         else:
             # No tool results — show the raw error
             self._append_html(render_message("system", translate("ChatDockWidget", "Error: ") + error_msg))
+        # The streamed text stays as the display of anything stored above
+        self._last_rendered_index = len(self.conversation.messages)
+        self._run_pending_rerender()
 
     # ── Tool call handlers ──────────────────────────────────
 
     @Slot(str, str)
     def _on_tool_call_started(self, tool_name, call_id):
         """Render tool call start in the chat."""
+        self._take_stream()
         self._append_html(render_tool_call(tool_name, call_id, started=True))
 
     @Slot(str, str, bool, str)
@@ -1423,15 +1687,13 @@ class ChatDockWidget(QDockWidget):
             f'{message}</div>'
         )
 
-    @Slot(str, str)
-    def _execute_tool_call(self, tool_name, arguments_json):
+    @Slot(str, object)
+    def _execute_tool_call(self, tool_name, arguments):
         """Execute a tool call on the main thread. Connected to worker's tool_exec_requested signal."""
         if not self._tool_registry:
             result = {"success": False, "output": "", "error": "No tool registry"}
         else:
-            try:
-                arguments = json.loads(arguments_json)
-            except json.JSONDecodeError:
+            if not isinstance(arguments, dict):
                 arguments = {}
             tool_result = self._tool_registry.execute(tool_name, arguments)
             result = {
@@ -1478,13 +1740,15 @@ class ChatDockWidget(QDockWidget):
 
     def _handle_execution_error(self, result):
         """Handle code execution failure — send error back to LLM for self-correction."""
-        if self._retry_count >= get_config().max_retries:
+        cfg = get_config()
+        max_retries = cfg.max_retries
+        if self._retry_count >= max_retries:
             self._append_html(render_message(
                 "system",
                 translate("ChatDockWidget",
                           "Max retries ({}) reached. "
                           "Please review the error and provide guidance.").format(
-                    get_config().max_retries)
+                    max_retries)
             ))
             self._retry_count = 0
             return
@@ -1495,28 +1759,22 @@ class ChatDockWidget(QDockWidget):
             "The code failed with the following error:\n\n"
             "{}\n\n"
             "Please fix the code and try again. (Attempt {}/{})").format(
-                result.stderr, self._retry_count, get_config().max_retries)
+                result.stderr, self._retry_count, max_retries)
 
         self.conversation.add_system_message(error_msg)
         self._append_html(render_message("system", error_msg))
 
-        from ..core.system_prompt import build_system_prompt
         mode = "plan" if self.mode_combo.currentIndex() == 0 else "act"
-        system_prompt = build_system_prompt(mode=mode)
-        messages = self.conversation.get_messages_for_api()
+        system_prompt = self._get_system_prompt(mode)
+        messages = self.conversation.get_messages_for_api(
+            token_budget=cfg.context_window)
 
         self._set_loading(True)
-        self._streaming_html = ""
-        self._append_html(
-            '<div style="margin: 8px 0; padding: 8px 12px; '
-            'background-color: #f5f5f5; border-radius: 6px;">'
-            '<div style="font-weight: bold; color: #2e7d32; margin-bottom: 4px;">AI</div>'
-            '<div style="white-space: pre-wrap;">'
-        )
+        self._begin_response_display()
 
         self._tool_results_stored = False
         self._worker = _LLMWorker(messages, system_prompt, parent=self)
-        self._worker.token_received.connect(self._on_token)
+        self._worker.stream_ready.connect(self._on_stream_ready)
         self._worker.response_finished.connect(self._on_response_finished)
         self._worker.error_occurred.connect(self._on_error)
         self._worker.start()
@@ -1562,6 +1820,7 @@ class ChatDockWidget(QDockWidget):
 
         # Display the command
         self.conversation.add_user_message(text)
+        self._chat_follow = True
         self._append_html(render_message("user", text))
 
         # Execute the skill
@@ -1594,13 +1853,45 @@ class ChatDockWidget(QDockWidget):
 
     # ── UI helpers ──────────────────────────────────────────
 
+    def _chat_end_cursor(self):
+        """Return the chat's insertion cursor, moved to the end of the history.
+
+        One cursor is kept for all appends instead of copying the widget's
+        cursor and syncing it back each time; it is recreated whenever the
+        rerender swaps in a new document.
+        """
+        self._chat_cursor.movePosition(QTextCursor.End)
+        return self._chat_cursor
+
+    @Slot(int)
+    def _on_chat_scrolled(self, value):
+        """Track whether the history is scrolled to (near) its end."""
+        scrollbar = self.chat_display.verticalScrollBar()
+        self._chat_follow = value >= scrollbar.maximum() - 4
+
+    def _scroll_chat_to_bottom(self):
+        """Scroll the chat history to its end if it was there before.
+
+        The scroll runs once after pending layout (next event loop pass),
+        however many updates were made in the meantime.
+        """
+        if not self._chat_follow or self._chat_scroll_pending:
+            return
+        self._chat_scroll_pending = True
+        QtCore.QTimer.singleShot(0, self._apply_chat_scroll)
+
+    def _apply_chat_scroll(self):
+        self._chat_scroll_pending = False
+        if self._chat_follow:
+            scrollbar = self.chat_display.verticalScrollBar()
+            scrollbar.setValue(scrollbar.maximum())
+
     def _append_html(self, html_str):
         """Append HTML to the chat display and scroll to bottom."""
-        cursor = self.chat_display.textCursor()
-        cursor.movePosition(QTextCursor.End)
+        self._commit_stream()
+        cursor = self._chat_end_cursor()
         cursor.insertHtml(html_str)
-        self.chat_display.setTextCursor(cursor)
-        self.chat_display.ensureCursorVisible()
+        self._scroll_chat_to_bottom()
 
     def _rerender_chat(self):
         """Re-render the entire chat history with proper formatting."""
@@ -1608,51 +1899,213 @@ class ChatDockWidget(QDockWidget):
             html_parts = []
             mode = "plan" if self.mode_combo.currentIndex() == 0 else "act"
 
-            for msg in self.conversation.messages:
-                if msg["role"] == "tool_result":
-                    # Tool results are rendered inline via tool_call_finished signals
-                    continue
-                elif msg["role"] == "assistant" and msg.get("tool_calls"):
-                    # Render assistant text + tool call indicators
-                    if msg.get("content"):
-                        html_parts.append(render_message("assistant", msg["content"]))
-                    for tc in msg["tool_calls"]:
-                        html_parts.append(render_tool_call(
-                            tc["name"], tc["id"], started=False, success=True,
-                            output=f"Called with: {json.dumps(tc['arguments'], indent=2)}"
-                        ))
-                else:
-                    html_parts.append(render_message(msg["role"], msg.get("content", "")))
-
-                if mode == "plan" and msg["role"] == "assistant":
-                    content = Conversation.extract_text(msg.get("content", ""))
-                    code_blocks = extract_code_blocks(content)
-                    for code in code_blocks:
-                        html_parts.append(self._make_plan_buttons_html(code))
+            # Only the most recent messages are laid out; long histories
+            # make QTextDocument layout slow
+            messages = self.conversation.messages
+            hidden = max(len(messages) - self._history_window, 0)
+            if hidden:
+                html_parts.append(
+                    '<div style="margin: 4px 0; text-align: center; font-size: 12px;">'
+                    '<a href="history:more">{}</a></div>'.format(
+                        translate("ChatDockWidget", "Show earlier messages ({} hidden)").format(
+                            hidden)))
+
+            # Messages are not modified once added, so their HTML is reused
+            # across rerenders; entries for dropped messages are pruned.
+            old_cache = self._render_cache
+            render_cache = self._render_cache = {}
+            append = html_parts.append
+            render = self._render_message_html
+            for msg in messages[hidden:]:
+                cached = old_cache.get(id(msg))
+                if (cached is None or cached[0] is not msg
+                        or cached[1] not in (None, mode)):
+                    cached = render(msg, mode)
+                render_cache[id(msg)] = cached
+                append(cached[2])
+            self._last_rendered_index = len(self.conversation.messages)
+            self._stream_start_pos = None
+            self._rerender_pending = False
+            self._prune_plan_codes()
 
             full_html = "".join(html_parts)
-            self.chat_display.setHtml(full_html)
 
+            # Lay out the history in a detached document and swap it in,
+            # rather than mutating the displayed document in place.
+            doc = QtGui.QTextDocument(self.chat_display)
+            doc.setDefaultFont(self.chat_display.font())
+            doc.setHtml(full_html)
+
+            old_doc = self.chat_display.document()
             scrollbar = self.chat_display.verticalScrollBar()
-            scrollbar.setValue(scrollbar.maximum())
+            follow, old_value = self._chat_follow, scrollbar.value()
+            self.chat_display.setUpdatesEnabled(False)
+            try:
+                self.chat_display.setDocument(doc)
+                self._chat_cursor = QTextCursor(doc)
+                # setDocument() resets the scroll position; restore it
+                # once the new document has been laid out
+                self._chat_follow = follow
+                if not follow:
+                    QtCore.QTimer.singleShot(0, lambda: scrollbar.setValue(old_value))
+            finally:
+                self.chat_display.setUpdatesEnabled(True)
+            if old_doc is not None and old_doc.parent() is self.chat_display:
+                old_doc.deleteLater()
+
+            self._scroll_chat_to_bottom()
         except Exception:
             pass  # Keep existing display content on error
 
+    def _request_rerender(self):
+        """Rerender the chat now, or after the response that is streaming.
+
+        A rerender swaps the document, which would drop the region the
+        current response is being streamed into.
+        """
+        if self._loading:
+            self._rerender_pending = True
+        elif self.conversation.messages:
+            self._rerender_chat()
+
+    def _run_pending_rerender(self):
+        """Perform a rerender deferred by _request_rerender()."""
+        if self._rerender_pending:
+            self._rerender_pending = False
+            self._rerender_chat()
+
+    def _begin_response_display(self):
+        """Open the AI response block and show the streaming pane.
+
+        Everything already in the conversation counts as displayed; the
+        messages stored for this response replace the streamed region
+        when it finishes (see _render_pending_messages).
+        """
+        self._commit_stream()
+        self._stream_start_pos = self.chat_display.document().characterCount() - 1
+        self._last_rendered_index = len(self.conversation.messages)
+        self._append_html(_AI_PRELUDE_HTML)
+        self.stream_display.show()
+
+    def _render_pending_messages(self):
+        """Replace the streamed response with its formatted messages.
+
+        Only the messages added since the response started are rendered,
+        so the cost does not grow with the length of the history. Falls
+        back to a full rerender if the stream start is unknown.
+        """
+        doc = self.chat_display.document()
+        start = self._stream_start_pos
+        if start is None or start > doc.characterCount() - 1:
+            self._rerender_chat()
+            return
+
+        mode = "plan" if self.mode_combo.currentIndex() == 0 else "act"
+        html_parts = []
+        for msg in self.conversation.messages[self._last_rendered_index:]:
+            cached = self._render_message_html(msg, mode)
+            self._render_cache[id(msg)] = cached
+            html_parts.append(cached[2])
+
+        cursor = QTextCursor(doc)
+        cursor.setPosition(start)
+        cursor.movePosition(QTextCursor.End, QTextCursor.KeepAnchor)
+        cursor.beginEditBlock()
+        cursor.removeSelectedText()
+        cursor.insertHtml("".join(html_parts))
+        cursor.endEditBlock()
+
+        self._last_rendered_index = len(self.conversation.messages)
+        self._stream_start_pos = None
+        self._scroll_chat_to_bottom()
+
+    def _render_message_html(self, msg, mode):
+        """Render one stored message, with tool indicators and plan buttons.
+
+        Returns a _render_cache entry: (msg, mode, html, plan codes), with
+        mode None when the message has no code blocks and so no Plan-mode
+        buttons.
+        """
+        if msg["role"] == "tool_result":
+            # Tool results are rendered inline via tool_call_finished signals
+            return (msg, None, "", ())
+
+        html_parts = []
+        if msg["role"] == "assistant" and msg.get("tool_calls"):
+            # Render assistant text + tool call indicators
+            if msg.get("content"):
+                html_parts.append(render_message("assistant", msg["content"]))
+            for tc in msg["tool_calls"]:
+                html_parts.append(render_tool_call(
+                    tc["name"], tc["id"], started=False, success=True,
+                    output=f"Called with: {self._pretty_tool_args(tc)}"
+                ))
+        else:
+            html_parts.append(render_message(msg["role"], msg.get("content", "")))
+
+        code_blocks = ()
+        plan_codes = ()
+        if msg["role"] == "assistant":
+            content = Conversation.extract_text(msg.get("content", ""))
+            code_blocks = self._extract_code_blocks(content)
+            if mode == "plan":
+                plan_codes = tuple(code_blocks)
+                for code in plan_codes:
+                    html_parts.append(self._make_plan_buttons_html(code))
+        return (msg, mode if code_blocks else None, "".join(html_parts), plan_codes)
+
+    def _pretty_tool_args(self, tc):
+        """Indented JSON of a tool call's arguments, cached by call id."""
+        cached = self._tool_args_text.get(tc["id"])
+        if cached is None or cached[0] is not tc["arguments"]:
+            cached = (tc["arguments"], json.dumps(tc["arguments"], indent=2))
+            self._tool_args_text[tc["id"]] = cached
+        return cached[1]
+
+    def _extract_code_blocks(self, text):
+        """extract_code_blocks(), memoized for the most recently scanned text."""
+        last_text, blocks = self._last_code_blocks
+        if last_text is not text:
+            blocks = extract_code_blocks(text)
+            self._last_code_blocks = (text, blocks)
+        return blocks
+
+    def _prune_plan_codes(self):
+        """Forget Execute/Copy ids of code blocks no longer in the display.
+
+        After a rerender the display holds exactly the messages in
+        _render_cache, so any other code can be released.
+        """
+        shown = {code for entry in self._render_cache.values() for code in entry[3]}
+        if len(shown) == len(self._plan_id_by_code):
+            return
+        self._plan_id_by_code = {
+            code: code_id for code, code_id in self._plan_id_by_code.items()
+            if code in shown
+        }
+        self._plan_code_by_id = {
+            code_id: code for code, code_id in self._plan_id_by_code.items()
+        }
+
     def _make_plan_buttons_html(self, code):
         """Create HTML for Plan mode Execute/Copy buttons."""
-        import base64
-        encoded = base64.b64encode(code.encode()).decode()
+        code_id = self._plan_id_by_code.get(code)
+        if code_id is None:
+            code_id = str(self._plan_next_id)
+            self._plan_next_id += 1
+            self._plan_id_by_code[code] = code_id
+            self._plan_code_by_id[code_id] = code
         return (
             '<div style="margin: 2px 0 8px 0;">'
-            '<a href="execute:{encoded}" style="text-decoration: none; '
+            '<a href="execute:{code_id}" style="text-decoration: none; '
             'background-color: #2e7d32; color: white; padding: 3px 12px; '
             'border-radius: 3px; font-size: 12px; margin-right: 6px;">'
             '{execute}</a> '
-            '<a href="copy:{encoded}" style="text-decoration: none; '
+            '<a href="copy:{code_id}" style="text-decoration: none; '
             'background-color: #666; color: white; padding: 3px 12px; '
             'border-radius: 3px; font-size: 12px;">{copy}</a>'
             '</div>'.format(
-                encoded=encoded,
+                code_id=code_id,
                 execute=translate("ChatDockWidget", "Execute"),
                 copy=translate("ChatDockWidget", "Copy"),
             )
@@ -1660,27 +2113,23 @@ class ChatDockWidget(QDockWidget):
 
     def _handle_anchor_click(self, url):
         """Handle clicks on anchor links in the chat (Execute/Copy/Image buttons)."""
-        import base64
         url_str = url.toString() if hasattr(url, "toString") else str(url)
+        scheme, _, rest = url_str.partition(":")
 
-        if url_str.startswith("image:"):
+        if scheme == "image":
             self._show_image_dialog(url_str)
             return
-        elif url_str.startswith("execute:"):
-            encoded = url_str[8:]
-            try:
-                code = base64.b64decode(encoded).decode()
-                self.execute_code_from_plan(code)
-            except Exception:
-                pass
-        elif url_str.startswith("copy:"):
-            encoded = url_str[5:]
-            try:
-                code = base64.b64decode(encoded).decode()
-                clipboard = QApplication.clipboard()
-                clipboard.setText(code)
-            except Exception:
-                pass
+        if scheme == "history":
+            self._history_window += HISTORY_WINDOW
+            self._request_rerender()
+            return
+        code = self._plan_code_by_id.get(rest)
+        if code is None:
+            return
+        if scheme == "execute":
+            self.execute_code_from_plan(code)
+        elif scheme == "copy":
+            QApplication.clipboard().setText(code)
 
     def _show_image_dialog(self, url_str: str):
         """Show a full-size image in a dialog when a thumbnail is clicked."""
@@ -1723,6 +2172,9 @@ class ChatDockWidget(QDockWidget):
 
     def _set_loading(self, loading):
         """Enable/disable input while LLM is processing."""
+        if loading == self._loading:
+            return
+        self._loading = loading
         self.send_btn.setEnabled(not loading)
         self.input_edit.setReadOnly(loading)
         if loading:
@@ -1739,14 +2191,19 @@ class ChatDockWidget(QDockWidget):
             )
 
     def _update_token_count(self):
+        """Schedule a token estimate refresh; repeated calls in one event-loop pass coalesce."""
+        if not self._token_count_timer.isActive():
+            self._token_count_timer.start()
+
+    def _refresh_token_count(self):
         """Update the token estimate display."""
         tokens = self.conversation.estimated_tokens()
         if tokens >= 1000:
-            self.token_label.setText(
-                translate("ChatDockWidget", "tokens: ~{:.1f}k").format(tokens / 1000))
+            text = translate("ChatDockWidget", "tokens: ~{:.1f}k").format(tokens / 1000)
         else:
-            self.token_label.setText(
-                translate("ChatDockWidget", "tokens: ~{}").format(tokens))
+            text = translate("ChatDockWidget", "tokens: ~{}").format(tokens)
+        if text != self.token_label.text():
+            self.token_label.setText(text)
 
     def _connect_mcp_servers(self, cfg, *, only_deferred=None):
         """Connect to configured MCP servers.
@@ -1791,6 +2248,7 @@ class ChatDockWidget(QDockWidget):
         """Save conversation and disconnect MCP when widget is closed."""
         if self.conversation.messages:
             self.conversation.save()
+        self._log_pool.waitForDone(2000)
         # Disconnect MCP servers
         if self._mcp_connected:
             try:
@@ -11,12 +11,25 @@ QDialog = QtWidgets.QDialog
 QVBoxLayout = QtWidgets.QVBoxLayout
 QHBoxLayout = QtWidgets.QHBoxLayout
 QTextEdit = QtWidgets.QTextEdit
+QPlainTextEdit = QtWidgets.QPlainTextEdit
 QLabel = QtWidgets.QLabel
 QPushButton = QtWidgets.QPushButton
 QFont = QtGui.QFont
 
 from ..core.executor import execute_code
 
+_MONO_FONT = None
+
+
+def _mono_font():
+    """Return the shared monospace font for the code and result views."""
+    global _MONO_FONT
+    if _MONO_FONT is None:
+        font = QFont("Monospace", 11)
+        font.setStyleHint(QFont.TypeWriter)
+        _MONO_FONT = font
+    return _MONO_FONT
+
 
 class CodeReviewDialog(QDialog):
     """Dialog for reviewing and optionally executing LLM-generated code."""
@@ -39,15 +52,14 @@ class CodeReviewDialog(QDialog):
         header.setStyleSheet("font-weight: bold; margin-bottom: 4px;")
         layout.addWidget(header)
 
-        # Code editor
-        self.code_edit = QTextEdit()
-        font = QFont("Monospace", 11)
-        font.setStyleHint(QFont.TypeWriter)
+        # Code editor (plain-text layout stays fast for very long code)
+        self.code_edit = QPlainTextEdit()
+        font = _mono_font()
         self.code_edit.setFont(font)
         self.code_edit.setPlainText(self.code)
         self.code_edit.setReadOnly(True)
         self.code_edit.setStyleSheet(
-            "QTextEdit { background-color: #1e1e1e; color: #d4d4d4; "
+            "QPlainTextEdit { background-color: #1e1e1e; color: #d4d4d4; "
             "border: 1px solid #555; padding: 8px; }"
         )
         layout.addWidget(self.code_edit)
@@ -95,13 +107,13 @@ class CodeReviewDialog(QDialog):
         if self._editable:
             self.edit_btn.setText(translate("CodeReviewDialog", "Lock"))
             self.code_edit.setStyleSheet(
-                "QTextEdit { background-color: #2d2d2d; color: #d4d4d4; "
+                "QPlainTextEdit { background-color: #2d2d2d; color: #d4d4d4; "
                 "border: 1px solid #3daee9; padding: 8px; }"
             )
         else:
             self.edit_btn.setText(translate("CodeReviewDialog", "Edit"))
             self.code_edit.setStyleSheet(
-                "QTextEdit { background-color: #1e1e1e; color: #d4d4d4; "
+                "QPlainTextEdit { background-color: #1e1e1e; color: #d4d4d4; "
                 "border: 1px solid #555; padding: 8px; }"
             )
 
@@ -4,25 +4,52 @@ Converts chat messages (with markdown-ish formatting and code blocks)
 into HTML suitable for display in a QTextBrowser.
 """
 
+import functools
 import html
 import re
 
-from ..i18n import translate
-
-# Match ```python ... ``` code blocks
-CODE_BLOCK_RE = re.compile(r"```(\w*)\n(.*?)```", re.DOTALL)
-
-# Match <think>...</think> blocks
-THINK_BLOCK_RE = re.compile(r"<think>(.*?)</think>", re.DOTALL)
-
-# Match inline `code`
-INLINE_CODE_RE = re.compile(r"`([^`]+)`")
-
-# Match **bold**
-BOLD_RE = re.compile(r"\*\*(.+?)\*\*")
-
-# Match *italic*
-ITALIC_RE = re.compile(r"\*(.+?)\*")
+from ..i18n import QT_TRANSLATE_NOOP, translate
+
+# Match ```lang ... ``` code blocks (groups 1, 2) or <think>...</think>
+# blocks (group 3) in a single pass
+BLOCK_RE = re.compile(r"```(\w*)\n(.*?)```|<think>(.*?)</think>", re.DOTALL)
+
+# Match inline `code` (group 1), **bold** (group 2) or *italic* (group 3)
+INLINE_RE = re.compile(r"`([^`]+)`|\*\*(.+?)\*\*|\*(.+?)\*")
+
+# role -> (label, background color, label color); unknown roles use "system"
+ROLE_STYLES = {
+    "user": (QT_TRANSLATE_NOOP("MessageView", "You"), "#e3f2fd", "#1565c0"),
+    "assistant": (QT_TRANSLATE_NOOP("MessageView", "AI"), "#f5f5f5", "#2e7d32"),
+    "system": (QT_TRANSLATE_NOOP("MessageView", "System"), "#fff3e0", "#e65100"),
+}
+
+# (success) -> (icon, text color, background, border color) for finished tool calls
+TOOL_RESULT_STYLES = {
+    True: ("&#10003;", "#2e7d32", "#e8f5e9", "#4caf50"),
+    False: ("&#10007;", "#c62828", "#fce4ec", "#ef5350"),
+}
+
+# Fixed fragments of render_code_block's HTML, around the language label and code
+_CODE_BLOCK_PREFIX = (
+    '<div style="margin: 6px 0; background-color: #1e1e1e; '
+    'border-radius: 4px; padding: 2px 0;">'
+    '<div style="padding: 2px 8px; font-size: 11px; color: #888;">'
+)
+_CODE_BLOCK_MIDDLE = (
+    '</div>'
+    '<pre style="margin: 0; padding: 8px; color: #d4d4d4; '
+    'font-family: monospace; font-size: 13px; overflow-x: auto;">'
+)
+_CODE_BLOCK_SUFFIX = '</pre></div>'
+
+# Longest code block / tool output shown in the chat; the rest is cut before
+# escaping so huge blobs never reach the QTextBrowser layout
+MAX_CODE_BLOCK_CHARS = 20000
+MAX_TOOL_OUTPUT_CHARS = 500
+
+# Longest text _escape() memoizes; fits truncated tool output and thinking
+MAX_ESCAPE_CACHE_CHARS = 2048
 
 
 def render_message(role: str, content) -> str:
@@ -35,45 +62,35 @@ def render_message(role: str, content) -> str:
     Returns:
         HTML string for insertion into QTextBrowser
     """
-    if role == "user":
-        label = translate("MessageView", "You")
-        bg_color = "#e3f2fd"
-        label_color = "#1565c0"
-    elif role == "assistant":
-        label = translate("MessageView", "AI")
-        bg_color = "#f5f5f5"
-        label_color = "#2e7d32"
-    else:
-        label = translate("MessageView", "System")
-        bg_color = "#fff3e0"
-        label_color = "#e65100"
+    label, bg_color, label_color = ROLE_STYLES.get(role, ROLE_STYLES["system"])
 
     if isinstance(content, list):
         formatted_content = _format_content_blocks(content)
     else:
         formatted_content = _format_content(content)
 
-    return (
-        f'<div style="margin: 8px 0; padding: 8px 12px; '
-        f'background-color: {bg_color}; border-radius: 6px;">'
-        f'<div style="font-weight: bold; color: {label_color}; '
-        f'margin-bottom: 4px;">{label}</div>'
-        f'<div style="white-space: pre-wrap;">{formatted_content}</div>'
-        f'</div>'
-    )
+    return "".join((
+        '<div style="margin: 8px 0; padding: 8px 12px; background-color: ',
+        bg_color,
+        '; border-radius: 6px;"><div style="font-weight: bold; color: ',
+        label_color,
+        '; margin-bottom: 4px;">',
+        translate("MessageView", label),
+        '</div><div style="white-space: pre-wrap;">',
+        formatted_content,
+        '</div></div>',
+    ))
 
 
 def render_code_block(code: str, language: str = "python") -> str:
     """Render a code block as a standalone HTML element with a copy-friendly format."""
-    escaped = html.escape(code.strip())
-    return (
-        f'<div style="margin: 6px 0; background-color: #1e1e1e; '
-        f'border-radius: 4px; padding: 2px 0;">'
-        f'<div style="padding: 2px 8px; font-size: 11px; color: #888;">{language}</div>'
-        f'<pre style="margin: 0; padding: 8px; color: #d4d4d4; '
-        f'font-family: monospace; font-size: 13px; overflow-x: auto;">'
-        f'{escaped}</pre></div>'
-    )
+    code = code.strip()
+    if len(code) > MAX_CODE_BLOCK_CHARS:
+        code = code[:MAX_CODE_BLOCK_CHARS] + "\n... " + translate(
+            "MessageView", "(truncated, {} more characters)").format(
+            len(code) - MAX_CODE_BLOCK_CHARS)
+    return (_CODE_BLOCK_PREFIX + language + _CODE_BLOCK_MIDDLE
+            + _escape(code) + _CODE_BLOCK_SUFFIX)
 
 
 def render_execution_result(success: bool, stdout: str, stderr: str) -> str:
@@ -96,7 +113,7 @@ def render_execution_result(success: bool, stdout: str, stderr: str) -> str:
     ]
 
     if stdout.strip():
-        escaped_out = html.escape(stdout.strip())
+        escaped_out = _escape(stdout.strip())
         parts.append(
             f'<pre style="margin: 4px 0 0 0; padding: 4px 8px; '
             f'background-color: #f0f0f0; font-size: 12px; '
@@ -104,7 +121,7 @@ def render_execution_result(success: bool, stdout: str, stderr: str) -> str:
         )
 
     if stderr.strip():
-        escaped_err = html.escape(stderr.strip())
+        escaped_err = _escape(stderr.strip())
         parts.append(
             f'<pre style="margin: 4px 0 0 0; padding: 4px 8px; '
             f'background-color: #fce4ec; font-size: 12px; '
@@ -137,16 +154,7 @@ def render_tool_call(tool_name: str, call_id: str, started: bool = True,
             '</div>'.format(calling_text)
         )
     else:
-        if success:
-            icon = "&#10003;"
-            color = "#2e7d32"
-            bg = "#e8f5e9"
-            border_color = "#4caf50"
-        else:
-            icon = "&#10007;"
-            color = "#c62828"
-            bg = "#fce4ec"
-            border_color = "#ef5350"
+        icon, color, bg, border_color = TOOL_RESULT_STYLES[bool(success)]
 
         parts = [
             f'<div style="margin: 4px 0; padding: 6px 10px; '
@@ -156,10 +164,11 @@ def render_tool_call(tool_name: str, call_id: str, started: bool = True,
         ]
 
         if output:
-            escaped_output = html.escape(output.strip())
-            # Truncate very long output
-            if len(escaped_output) > 500:
-                escaped_output = escaped_output[:500] + "..."
+            # Truncate very long output before escaping it
+            output = output.strip()
+            if len(output) > MAX_TOOL_OUTPUT_CHARS:
+                output = output[:MAX_TOOL_OUTPUT_CHARS] + "..."
+            escaped_output = _escape(output)
             parts.append(
                 f'<pre style="margin: 4px 0 0 0; padding: 4px 8px; '
                 f'background-color: rgba(0,0,0,0.05); font-size: 11px; '
@@ -172,10 +181,11 @@ def render_tool_call(tool_name: str, call_id: str, started: bool = True,
 
 def _render_thinking_block(thinking_text: str) -> str:
     """Render a <think> block as a dimmed, collapsible-style block."""
-    escaped = html.escape(thinking_text.strip())
-    # Truncate very long thinking
-    if len(escaped) > 2000:
-        escaped = escaped[:2000] + "..."
+    # Truncate very long thinking before escaping it
+    thinking_text = thinking_text.strip()
+    if len(thinking_text) > 2000:
+        thinking_text = thinking_text[:2000] + "..."
+    escaped = _escape(thinking_text)
     return (
         '<div style="margin: 4px 0; padding: 4px 8px; '
         'background-color: #f0f0f0; border-left: 2px solid #ccc; '
@@ -205,57 +215,77 @@ def _format_content_blocks(blocks: list) -> str:
     return "".join(parts)
 
 
-def _format_content(text: str) -> str:
-    """Convert markdown-ish text to HTML, handling code blocks and think blocks."""
-    # First strip <think> blocks
-    parts = []
-    last_end = 0
+def clear_render_cache():
+    """Drop cached formatting results (e.g. when the conversation is reset)."""
+    _format_content.cache_clear()
+    _escape_short.cache_clear()
+
 
-    # Combine code blocks and think blocks into a single pass
-    # by finding all special blocks and processing in order
-    code_matches = list(CODE_BLOCK_RE.finditer(text))
-    think_matches = list(THINK_BLOCK_RE.finditer(text))
+def _escape(text: str) -> str:
+    """html.escape(), memoized for short texts such as truncated tool output.
+
+    Long texts (full code blocks, execution output) are escaped directly,
+    so the cache never pins large strings.
+    """
+    if len(text) > MAX_ESCAPE_CACHE_CHARS:
+        return html.escape(text)
+    return _escape_short(text)
+
+
+@functools.lru_cache(maxsize=1024)
+def _escape_short(text: str) -> str:
+    return html.escape(text)
 
-    # Merge and sort all matches by start position
-    all_matches = [(m, "code") for m in code_matches] + [(m, "think") for m in think_matches]
-    all_matches.sort(key=lambda x: x[0].start())
 
-    for match, match_type in all_matches:
-        if match.start() < last_end:
-            continue  # Skip overlapping matches
+@functools.lru_cache(maxsize=2048)
+def _format_content(text: str) -> str:
+    """Convert markdown-ish text to HTML, handling code blocks and think blocks.
 
+    Results are cached: rerendering the chat formats the same message text
+    again, and the output depends only on the text.
+    """
+    parts = []
+    append = parts.append  # bound once; called for every block
+    last_end = 0
+
+    # Code blocks and think blocks are found in one scan, in order
+    for match in BLOCK_RE.finditer(text):
         # Process text before this block
         before = text[last_end:match.start()]
         if before:
-            parts.append(_format_inline(html.escape(before)))
+            append(_format_inline(html.escape(before)))
 
-        if match_type == "code":
+        think = match.group(3)
+        if think is None:
             language = match.group(1) or "python"
             code = match.group(2)
-            parts.append(render_code_block(code, language))
-        elif match_type == "think":
-            parts.append(_render_thinking_block(match.group(1)))
+            append(render_code_block(code, language))
+        else:
+            append(_render_thinking_block(think))
 
         last_end = match.end()
 
     # Process remaining text after last block
     remaining = text[last_end:]
     if remaining:
-        parts.append(_format_inline(html.escape(remaining)))
+        append(_format_inline(html.escape(remaining)))
 
     return "".join(parts)
 
 
 def _format_inline(text: str) -> str:
     """Apply inline formatting (bold, italic, inline code) to already-escaped HTML text."""
-    # Inline code
-    text = INLINE_CODE_RE.sub(
-        r'<code style="background-color: #e0e0e0; padding: 1px 4px; '
-        r'border-radius: 3px; font-family: monospace;">\1</code>',
-        text
-    )
-    # Bold
-    text = BOLD_RE.sub(r"<b>\1</b>", text)
-    # Italic
-    text = ITALIC_RE.sub(r"<i>\1</i>", text)
-    return text
+    return INLINE_RE.sub(_inline_replacement, text)
+
+
+def _inline_replacement(match) -> str:
+    """Return the HTML for one INLINE_RE match; bold/italic text is formatted recursively."""
+    code, bold, italic = match.groups()
+    if code is not None:
+        return (
+            '<code style="background-color: #e0e0e0; padding: 1px 4px; '
+            'border-radius: 3px; font-family: monospace;">' + code + '</code>'
+        )
+    if bold is not None:
+        return "<b>" + _format_inline(bold) + "</b>"
+    return "<i>" + _format_inline(italic) + "</i>"
@@ -11,53 +11,57 @@ Provides a GUI for configuring:
 
 import os
 
-from .compat import QtWidgets, QtCore, QtGui
+from .compat import QtWidgets, QtCore
 from ..i18n import translate
 
+# Only the names the class statements below need; widget classes are looked
+# up when a dialog is built, and QtGui only when it is used
 QDialog = QtWidgets.QDialog
-QVBoxLayout = QtWidgets.QVBoxLayout
-QHBoxLayout = QtWidgets.QHBoxLayout
-QFormLayout = QtWidgets.QFormLayout
-QGroupBox = QtWidgets.QGroupBox
-QComboBox = QtWidgets.QComboBox
-QLineEdit = QtWidgets.QLineEdit
-QSpinBox = QtWidgets.QSpinBox
-QCheckBox = QtWidgets.QCheckBox
-QPushButton = QtWidgets.QPushButton
-QLabel = QtWidgets.QLabel
 Signal = QtCore.Signal
-QThread = QtCore.QThread
-QDoubleValidator = QtGui.QDoubleValidator
-
-QListWidget = QtWidgets.QListWidget
-QListWidgetItem = QtWidgets.QListWidgetItem
-QFileDialog = QtWidgets.QFileDialog
-QMessageBox = QtWidgets.QMessageBox
+QObject = QtCore.QObject
+QRunnable = QtCore.QRunnable
 
 from ..config import get_config, save_current_config, PROVIDER_PRESETS
 from ..llm.providers import get_provider_names
 
 
-class _TestConnectionThread(QThread):
-    """Background thread for testing LLM connection and vision capability."""
+class _TestConnectionSignals(QObject):
+    """Signals of a _TestConnectionTask (QRunnable is not a QObject)."""
     finished = Signal(bool, str)        # success, message
     vision_result = Signal(bool)        # vision probe result
 
-    def __init__(self, parent=None):
-        super().__init__(parent)
+
+class _TestConnectionTask(QRunnable):
+    """Pool task for testing LLM connection and vision capability."""
+
+    # create_client_from_config, imported by the first test and kept here
+    # so later clicks go straight to the request
+    _create_client = None
+
+    def __init__(self):
+        super().__init__()
+        self.signals = _TestConnectionSignals()
+
+    @classmethod
+    def _client_factory(cls):
+        """Return the LLM client factory, importing llm.client on first use."""
+        if cls._create_client is None:
+            from ..llm.client import create_client_from_config
+            cls._create_client = staticmethod(create_client_from_config)
+        return cls._create_client
 
     def run(self):
         try:
-            from ..llm.client import create_client_from_config
-            client = create_client_from_config()
+            client = self._client_factory()()
             response = client.test_connection()
-            self.finished.emit(True, translate("SettingsDialog", "Connected! Response: ") + response)
+            self.signals.finished.emit(
+                True, translate("SettingsDialog", "Connected! Response: ") + response)
 
             # Run vision probe after successful connection
             vision_ok = client.vision_probe()
-            self.vision_result.emit(vision_ok)
+            self.signals.vision_result.emit(vision_ok)
         except Exception as e:
-            self.finished.emit(False, str(e))
+            self.signals.finished.emit(False, str(e))
 
 
 class SettingsDialog(QDialog):
@@ -69,11 +73,31 @@ class SettingsDialog(QDialog):
         self.setMinimumWidth(500)
         self.setMinimumHeight(400)
         self.resize(540, 700)
-        self._test_thread = None
+        self._test_task = None
+        # The config singleton this dialog edits
+        self._cfg = get_config()
+        # Provider list and presets are fixed for the dialog's lifetime
+        self._provider_names = tuple(get_provider_names())
+        self._preset_by_name = {
+            n: PROVIDER_PRESETS.get(n, {}) for n in self._provider_names
+        }
         self._build_ui()
         self._load_from_config()
 
     def _build_ui(self):
+        from .compat import QtGui
+        QVBoxLayout = QtWidgets.QVBoxLayout
+        QHBoxLayout = QtWidgets.QHBoxLayout
+        QFormLayout = QtWidgets.QFormLayout
+        QGroupBox = QtWidgets.QGroupBox
+        QComboBox = QtWidgets.QComboBox
+        QLineEdit = QtWidgets.QLineEdit
+        QSpinBox = QtWidgets.QSpinBox
+        QCheckBox = QtWidgets.QCheckBox
+        QPushButton = QtWidgets.QPushButton
+        QLabel = QtWidgets.QLabel
+        QListWidget = QtWidgets.QListWidget
+
         outer_layout = QVBoxLayout(self)
 
         # Scrollable content area
@@ -91,8 +115,8 @@ class SettingsDialog(QDialog):
         provider_layout = QFormLayout()
 
         self.provider_combo = QComboBox()
-        self.provider_combo.addItems([n.capitalize() for n in get_provider_names()])
-        self.provider_combo.currentIndexChanged.connect(self._on_provider_changed)
+        self.provider_combo.addItems([n.capitalize() for n in self._provider_names])
+        self.provider_combo.currentIndexChanged[int].connect(self._on_provider_changed)
         provider_layout.addRow(translate("SettingsDialog", "Provider:"), self.provider_combo)
 
         self.api_key_edit = QLineEdit()
@@ -127,7 +151,7 @@ class SettingsDialog(QDialog):
         params_layout.addRow(translate("SettingsDialog", "Max Output Tokens:"), self.max_tokens_spin)
 
         self.temperature_edit = QLineEdit()
-        self.temperature_edit.setValidator(QDoubleValidator(0.0, 2.0, 2))
+        self.temperature_edit.setValidator(QtGui.QDoubleValidator(0.0, 2.0, 2))
         self.temperature_edit.setText("0.3")
         params_layout.addRow(translate("SettingsDialog", "Temperature:"), self.temperature_edit)
 
@@ -363,9 +387,9 @@ class SettingsDialog(QDialog):
 
     def _load_from_config(self):
         """Populate fields from the current config."""
-        cfg = get_config()
+        cfg = self._cfg
 
-        names = get_provider_names()
+        names = self._provider_names
         try:
             idx = names.index(cfg.provider.name)
         except ValueError:
@@ -395,14 +419,18 @@ class SettingsDialog(QDialog):
         self._update_vision_ui(cfg)
 
         # MCP servers
-        self.mcp_list.clear()
         self._mcp_configs = list(cfg.mcp_servers)
-        for entry in self._mcp_configs:
-            self.mcp_list.addItem(self._mcp_list_label(entry))
+        self.mcp_list.setUpdatesEnabled(False)
+        self.mcp_list.blockSignals(True)
+        try:
+            self.mcp_list.clear()
+            self.mcp_list.addItems([self._mcp_list_label(e) for e in self._mcp_configs])
+        finally:
+            self.mcp_list.blockSignals(False)
+            self.mcp_list.setUpdatesEnabled(True)
 
         # User tools
         self.scan_macros_cb.setChecked(cfg.scan_freecad_macros)
-        self._cfg = cfg
         self._load_user_tools_list()
 
         # Hooks
@@ -410,17 +438,21 @@ class SettingsDialog(QDialog):
 
     def _on_provider_changed(self, index):
         """Update base URL and model when provider selection changes."""
-        names = get_provider_names()
+        names = self._provider_names
         if 0 <= index < len(names):
             name = names[index]
-            preset = PROVIDER_PRESETS.get(name, {})
+            preset = self._preset_by_name[name]
             self.base_url_edit.setText(preset.get("base_url", ""))
             self.model_edit.setText(preset.get("default_model", ""))
 
-    def _save(self):
-        """Save settings to config and close."""
-        cfg = get_config()
-        names = get_provider_names()
+    def _apply_ui_to_config(self, connection_only=False):
+        """Copy the dialog's fields into the config (without saving it).
+
+        With connection_only, only the fields the connection test needs are
+        applied, and an invalid temperature keeps the current value.
+        """
+        cfg = self._cfg
+        names = self._provider_names
         idx = self.provider_combo.currentIndex()
         cfg.provider.name = names[idx] if 0 <= idx < len(names) else "anthropic"
         cfg.provider.api_key = self.api_key_edit.text()
@@ -432,13 +464,17 @@ class SettingsDialog(QDialog):
         try:
             cfg.temperature = float(self.temperature_edit.text())
         except ValueError:
-            cfg.temperature = 0.3
-
-        cfg.auto_execute = self.auto_execute_check.isChecked()
+            if not connection_only:
+                cfg.temperature = 0.3
 
         thinking_values = ["off", "on", "extended"]
         cfg.thinking = thinking_values[self.thinking_combo.currentIndex()]
 
+        if connection_only:
+            return
+
+        cfg.auto_execute = self.auto_execute_check.isChecked()
+
         capture_values = ["off", "every_message", "after_changes"]
         cfg.viewport_capture = capture_values[self.viewport_capture_combo.currentIndex()]
 
@@ -456,12 +492,16 @@ class SettingsDialog(QDialog):
         cfg.mcp_servers = list(self._mcp_configs) if hasattr(self, "_mcp_configs") else []
         cfg.scan_freecad_macros = self.scan_macros_cb.isChecked()
 
+    def _save(self):
+        """Save settings to config and close."""
+        self._apply_ui_to_config()
         save_current_config()
         self.accept()
 
     def _test_connection(self):
         """Test the LLM connection in a background thread."""
-        self._save_temp()
+        # Apply the connection fields so the test uses them
+        self._apply_ui_to_config(connection_only=True)
 
         self.test_btn.setEnabled(False)
         self.save_btn.setEnabled(False)
@@ -469,10 +509,10 @@ class SettingsDialog(QDialog):
         self.test_status.setText(translate("SettingsDialog", "Testing..."))
         self.test_status.setStyleSheet("color: #666;")
 
-        self._test_thread = _TestConnectionThread(self)
-        self._test_thread.finished.connect(self._on_test_finished)
-        self._test_thread.vision_result.connect(self._on_vision_probed)
-        self._test_thread.start()
+        self._test_task = _TestConnectionTask()
+        self._test_task.signals.finished.connect(self._on_test_finished)
+        self._test_task.signals.vision_result.connect(self._on_vision_probed)
+        QtCore.QThreadPool.globalInstance().start(self._test_task)
 
     def _on_test_finished(self, success, message):
         """Handle test connection result."""
@@ -493,7 +533,7 @@ class SettingsDialog(QDialog):
         self.test_btn.setEnabled(True)
         self.save_btn.setEnabled(True)
         self.cancel_btn.setEnabled(True)
-        cfg = get_config()
+        cfg = self._cfg
         cfg.vision_detected = supports_vision
         save_current_config()
         self._update_vision_ui(cfg)
@@ -511,32 +551,6 @@ class SettingsDialog(QDialog):
         except ImportError:
             pass
 
-    def _save_temp(self):
-        """Temporarily apply current UI values to config (for test connection)."""
-        cfg = get_config()
-        names = get_provider_names()
-        idx = self.provider_combo.currentIndex()
-        cfg.provider.name = names[idx] if 0 <= idx < len(names) else "anthropic"
-        cfg.provider.api_key = self.api_key_edit.text()
-        cfg.provider.base_url = self.base_url_edit.text()
-        cfg.provider.model = self.model_edit.text()
-
-        try:
-            cfg.max_tokens = self.max_tokens_spin.value()
-        except Exception:
-            pass
-        try:
-            cfg.context_window = self.context_window_spin.value()
-        except Exception:
-            pass
-        try:
-            cfg.temperature = float(self.temperature_edit.text())
-        except ValueError:
-            pass
-
-        thinking_values = ["off", "on", "extended"]
-        cfg.thinking = thinking_values[self.thinking_combo.currentIndex()]
-
     @staticmethod
     def _mcp_list_label(entry: dict) -> str:
         """Build display label for an MCP server entry."""
@@ -616,13 +630,13 @@ class SettingsDialog(QDialog):
             if fname in disabled:
                 label = f"(disabled) {label}"
 
-            self.user_tools_list.addItem(QListWidgetItem(label))
+            self.user_tools_list.addItem(QtWidgets.QListWidgetItem(label))
 
     def _add_user_tool(self):
         """Open file picker and copy selected file to user tools dir."""
         from ..config import USER_TOOLS_DIR
 
-        path, _ = QFileDialog.getOpenFileName(
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(
             self,
             translate("SettingsDialog", "Select Tool File"),
             "",
@@ -635,7 +649,7 @@ class SettingsDialog(QDialog):
         os.makedirs(USER_TOOLS_DIR, exist_ok=True)
         dest = os.path.join(USER_TOOLS_DIR, os.path.basename(path))
         if os.path.exists(dest):
-            QMessageBox.warning(
+            QtWidgets.QMessageBox.warning(
                 self,
                 translate("SettingsDialog", "File Exists"),
                 f"'{os.path.basename(path)}' already exists in tools directory.",
@@ -700,7 +714,7 @@ class SettingsDialog(QDialog):
 
     def _reset_vision_override(self):
         """Clear the manual override, revert to auto-detected value."""
-        cfg = get_config()
+        cfg = self._cfg
         self._vision_override_value = None
         self._update_vision_ui(cfg)
 
@@ -724,7 +738,7 @@ class SettingsDialog(QDialog):
     def _add_hook(self):
         """Add a hook by copying a hook.py file into a new directory."""
         from ..config import HOOKS_DIR
-        path, _ = QFileDialog.getOpenFileName(
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(
             self, translate("SettingsDialog", "Select hook.py file"), "",
             translate("SettingsDialog", "Python files (*.py)"))
         if not path:
@@ -752,6 +766,7 @@ class SettingsDialog(QDialog):
             if row >= len(hooks):
                 return
             hook_path = os.path.join(hooks[row]["path"], "hook.py")
+            from .compat import QtGui
             url = QtCore.QUrl.fromLocalFile(hook_path)
             QtGui.QDesktopServices.openUrl(url)
         except Exception:
@@ -769,15 +784,15 @@ class SettingsDialog(QDialog):
                 return
             hook = hooks[row]
             if hook.get("builtin"):
-                QMessageBox.information(
+                QtWidgets.QMessageBox.information(
                     self, translate("SettingsDialog", "Cannot Remove"),
                     translate("SettingsDialog",
                               "Built-in hooks cannot be removed. You can disable them instead."))
                 return
-            reply = QMessageBox.question(
+            reply = QtWidgets.QMessageBox.question(
                 self, translate("SettingsDialog", "Remove Hook"),
                 translate("SettingsDialog", "Remove hook '") + hook["name"] + "'?")
-            if reply != QMessageBox.Yes:
+            if reply != QtWidgets.QMessageBox.Yes:
                 return
             import shutil
             shutil.rmtree(hook["path"], ignore_errors=True)
@@ -811,6 +826,12 @@ class _AddMCPServerDialog(QDialog):
             self._populate(existing)
 
     def _build_ui(self, editing=False):
+        QHBoxLayout = QtWidgets.QHBoxLayout
+        QFormLayout = QtWidgets.QFormLayout
+        QLineEdit = QtWidgets.QLineEdit
+        QCheckBox = QtWidgets.QCheckBox
+        QPushButton = QtWidgets.QPushButton
+
         layout = QFormLayout(self)
 
         self.name_edit = QLineEdit()
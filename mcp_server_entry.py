@@ -15,8 +15,9 @@ Usage in Claude Desktop config:
 }
 
 The bash wrapper redirects fd 1 to stderr before FreeCAD starts, so the
-C++ console banner goes to stderr. This script then restores fd 1 from
-the saved fd 3 for clean JSON-RPC output.
+C++ console banner goes to stderr. This script then writes JSON-RPC to
+the saved fd 3 (the original stdout), while fd 1 keeps pointing at stderr
+so any later C++ console output cannot corrupt the protocol stream.
 
 Alternatively, without the bash wrapper, MCP clients that skip non-JSON
 lines will still work (the StdioClientTransport does this).
@@ -25,22 +26,16 @@ lines will still work (the StdioClientTransport does this).
 import os
 import sys
 
-# If launched via the bash wrapper (fd 3 = original stdout), restore it.
-# Otherwise, redirect fd 1 -> stderr to catch any remaining C++ output.
-_have_saved_fd = True
+# If launched via the bash wrapper, fd 3 is the original stdout and fd 1
+# already points to stderr. Otherwise, save the original stdout and
+# redirect fd 1 -> stderr to catch any remaining C++ output.
 try:
     os.fstat(3)
+    _stdout_fd = 3
 except OSError:
-    _have_saved_fd = False
-
-if _have_saved_fd:
-    # bash wrapper saved real stdout on fd 3
-    os.dup2(3, 1)
-    os.close(3)
-else:
-    # Direct invocation: redirect fd 1 -> stderr for any future C++ output.
-    # The C++ banner already went to the original fd 1 (unavoidable).
-    _saved_fd = os.dup(1)
+    # Direct invocation: the C++ banner already went to the original
+    # fd 1 (unavoidable).
+    _stdout_fd = os.dup(1)
     os.dup2(2, 1)
 
 # Redirect Python-level stdout to stderr during init
@@ -57,15 +52,9 @@ import FreeCAD  # noqa: E402
 if not FreeCAD.ActiveDocument:
     FreeCAD.newDocument("Unnamed")
 
-# Restore stdout for JSON-RPC communication
-if _have_saved_fd:
-    # fd 1 already points to real stdout
-    sys.stdout = os.fdopen(1, "w")
-else:
-    # Restore fd 1 from saved copy
-    os.dup2(_saved_fd, 1)
-    os.close(_saved_fd)
-    sys.stdout = os.fdopen(1, "w")
+# JSON-RPC goes to the saved original stdout; line buffering sends each
+# newline-terminated message as soon as it is written
+sys.stdout = os.fdopen(_stdout_fd, "w", buffering=1)
 
 # Create registry without MCP client tools (we ARE the server)
 from freecad_ai.tools.setup import create_default_registry  # noqa: E402
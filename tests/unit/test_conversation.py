@@ -190,6 +190,68 @@ class TestTruncation:
         assert c.get_messages_for_api() == []
 
 
+class TestApiMessageCache:
+    def test_repeated_calls_return_equal_fresh_lists(self):
+        c = Conversation()
+        c.add_user_message("Hello")
+        c.add_assistant_message("Hi")
+        first = c.get_messages_for_api()
+        second = c.get_messages_for_api()
+        assert first == second
+        assert first is not second
+
+    def test_new_message_invalidates(self):
+        c = Conversation()
+        c.add_user_message("Hello")
+        assert len(c.get_messages_for_api()) == 1
+        c.add_assistant_message("Hi")
+        assert len(c.get_messages_for_api()) == 2
+
+    def test_direct_append_invalidates(self):
+        c = Conversation()
+        c.add_user_message("Hello")
+        c.get_messages_for_api()
+        c.messages.append({"role": "assistant", "content": "Hi"})
+        assert len(c.get_messages_for_api()) == 2
+
+    def test_cached_per_api_style(self):
+        c = Conversation()
+        c.add_user_message("Start")
+        tc = [{"id": "tc1", "name": "test", "arguments": {}}]
+        c.add_assistant_message("", tool_calls=tc)
+        c.add_tool_result("tc1", "ok")
+        oai = c.get_messages_for_api(api_style="openai")
+        anth = c.get_messages_for_api(api_style="anthropic")
+        assert oai[-1]["role"] == "tool"
+        assert anth[-1]["role"] == "user"
+
+    def test_clear_invalidates(self):
+        c = Conversation()
+        c.add_user_message("Hello")
+        c.get_messages_for_api()
+        c.clear()
+        assert c.get_messages_for_api() == []
+
+    def test_converted_messages_reused_across_turns(self):
+        c = Conversation()
+        c.add_user_message("Hello")
+        c.add_assistant_message("Hi")
+        first = c.get_messages_for_api(api_style="anthropic")
+        c.add_user_message("Again")
+        second = c.get_messages_for_api(api_style="anthropic")
+        assert second[0] is first[0]
+        assert second[1] is first[1]
+        assert second[2] == {"role": "user", "content": "Again"}
+
+    def test_conversion_cache_is_bounded(self):
+        c = Conversation()
+        c.add_user_message("Hello")
+        for _ in range(50):
+            c.messages[0] = {"role": "user", "content": "Hello"}
+            c.get_messages_for_api()
+        assert len(c._converted) <= 2 * len(c.messages) + 16
+
+
 class TestEstimatedTokens:
     def test_empty_conversation(self):
         c = Conversation()
@@ -209,6 +271,38 @@ class TestEstimatedTokens:
         assert tokens > 0
 
 
+    def test_running_total_matches_recount(self):
+        c = Conversation()
+        c.add_user_message("a" * 400)
+        assert c.estimated_tokens() == 100
+        c.add_assistant_message("b" * 400)
+        c.add_tool_result("tc1", "c" * 400)
+        assert c.estimated_tokens() == 300
+
+    def test_direct_append_is_counted(self):
+        c = Conversation()
+        c.add_user_message("a" * 400)
+        c.estimated_tokens()
+        c.messages.append({"role": "assistant", "content": "b" * 400})
+        assert c.estimated_tokens() == 200
+
+    def test_recounted_after_compact(self):
+        c = Conversation()
+        for i in range(10):
+            c.add_user_message("x" * 400)
+            c.add_assistant_message("y" * 400)
+        before = c.estimated_tokens()
+        c.compact("short", keep_recent=4)
+        assert c.estimated_tokens() < before
+
+    def test_reset_after_clear(self):
+        c = Conversation()
+        c.add_user_message("a" * 400)
+        c.estimated_tokens()
+        c.clear()
+        assert c.estimated_tokens() == 0
+
+
 class TestCompaction:
     def test_compact_replaces_old_messages(self):
         c = Conversation()
@@ -267,6 +361,81 @@ class TestCompaction:
         assert c.needs_compaction() is False  # only 1 message
 
 
+class TestLocalSummary:
+    def _long_conversation(self, n=30):
+        c = Conversation()
+        for i in range(n):
+            c.add_user_message(f"Message {i} " + "x" * 400)
+            c.add_assistant_message(f"Reply {i} " + "y" * 400)
+        return c
+
+    def test_no_summary_below_threshold(self):
+        c = self._long_conversation(3)
+        msgs = c.get_messages_for_api(token_budget=100000)
+        assert len(msgs) == 6
+        assert "Context Summary" not in msgs[0]["content"]
+
+    def test_summary_replaces_older_messages(self):
+        c = self._long_conversation()
+        msgs = c.get_messages_for_api(token_budget=1000, keep_recent=6)
+        assert msgs[0]["content"].startswith("[Context Summary")
+        assert "[User] Message 0" in msgs[0]["content"]
+        assert len(msgs) == 7
+        assert msgs[-1]["content"].startswith("Reply 29")
+
+    def test_history_is_not_modified(self):
+        c = self._long_conversation()
+        c.get_messages_for_api(token_budget=1000)
+        assert len(c.messages) == 60
+        assert c.messages[0]["content"].startswith("Message 0")
+
+    def test_summary_doesnt_split_tool_pairs(self):
+        c = Conversation()
+        for i in range(20):
+            c.add_user_message(f"Msg {i} " + "x" * 400)
+            tc = [{"id": f"tc{i}", "name": "test", "arguments": {}}]
+            c.add_assistant_message(f"Call {i}", tool_calls=tc)
+            c.add_tool_result(f"tc{i}", f"Result {i}")
+        msgs = c.get_messages_for_api(token_budget=1000, keep_recent=5)
+        assert msgs[0]["content"].startswith("[Context Summary")
+        for i, m in enumerate(msgs):
+            if m["role"] == "tool":
+                assert msgs[i - 1]["role"] in ("assistant", "tool")
+
+    def test_summary_stable_across_sends(self):
+        c = self._long_conversation()
+        first = c.get_messages_for_api(token_budget=1000, keep_recent=6)
+        c.add_user_message("Next " + "x" * 400)
+        c.add_assistant_message("Reply " + "y" * 400)
+        second = c.get_messages_for_api(token_budget=1000, keep_recent=6)
+        assert second[0] == first[0]
+        assert second[1:-2] == first[1:]
+
+    def test_summary_advances_in_chunks(self):
+        c = self._long_conversation()
+        first = c.get_messages_for_api(token_budget=1000, keep_recent=4)
+        for i in range(4):
+            c.add_user_message(f"More {i} " + "x" * 400)
+            c.add_assistant_message(f"Reply {i} " + "y" * 400)
+        later = c.get_messages_for_api(token_budget=1000, keep_recent=4)
+        assert later[0] != first[0]
+        assert len(later) == 5
+
+    def test_digest_lists_tool_calls(self):
+        c = Conversation()
+        c.add_user_message("make a box")
+        c.add_assistant_message("ok", tool_calls=[
+            {"id": "a", "name": "create_box", "arguments": {}}])
+        c.add_tool_result("a", "done")
+        digest = Conversation.digest(c.messages)
+        assert digest.splitlines() == [
+            "[User] make a box",
+            "[Assistant] Called tools: create_box",
+            "  Text: ok",
+            "[Tool Result] done",
+        ]
+
+
 class TestClear:
     def test_clear_removes_all(self):
         c = Conversation()
@@ -292,6 +461,41 @@ class TestPersistence:
         assert loaded.model == "test-model"
         assert len(loaded.messages) == 2
 
+    def test_save_matches_json_dump(self, tmp_config_dir, monkeypatch):
+        import freecad_ai.core.conversation as conv_mod
+        conv_dir = os.path.join(str(tmp_config_dir), "conversations")
+        monkeypatch.setattr(conv_mod, "CONVERSATIONS_DIR", conv_dir)
+
+        c = Conversation(conversation_id="test-conv-2", model="m")
+        c.add_user_message("Hello\nworld")
+        tc = [{"id": "tc1", "name": "test", "arguments": {"a": [1, 2]}}]
+        c.add_assistant_message("", tool_calls=tc)
+        c.add_tool_result("tc1", "Done")
+        c.save()
+
+        expected = json.dumps({
+            "conversation_id": c.conversation_id,
+            "created_at": c.created_at,
+            "model": c.model,
+            "messages": c.messages,
+        }, indent=2)
+        with open(os.path.join(conv_dir, "test-conv-2.json")) as f:
+            assert f.read() == expected
+
+    def test_save_empty_conversation_loads(self, tmp_config_dir, monkeypatch):
+        import freecad_ai.core.conversation as conv_mod
+        conv_dir = os.path.join(str(tmp_config_dir), "conversations")
+        monkeypatch.setattr(conv_mod, "CONVERSATIONS_DIR", conv_dir)
+
+        Conversation(conversation_id="empty").save()
+        assert Conversation.load("empty").messages == []
+
+    def test_message_json_is_reused(self):
+        c = Conversation()
+        c.add_user_message("Hello")
+        msg = c.messages[0]
+        assert c.message_json(msg) is c.message_json(msg)
+
     def test_list_saved(self, tmp_config_dir, monkeypatch):
         import freecad_ai.core.conversation as conv_mod
         conv_dir = os.path.join(str(tmp_config_dir), "conversations")
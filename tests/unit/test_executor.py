@@ -2,7 +2,7 @@
 
 import pytest
 
-from freecad_ai.core.executor import extract_code_blocks, _validate_code
+from freecad_ai.core.executor import CODE_BLOCK_RE, extract_code_blocks, _validate_code
 
 
 class TestExtractCodeBlocks:
@@ -50,6 +50,25 @@ class TestExtractCodeBlocks:
         # Regex matches greedily but should get at least one block
         assert len(blocks) >= 1
 
+    def test_unterminated_block(self):
+        assert extract_code_blocks("```python\nx = 1\n") == []
+
+    def test_blank_lines_after_fence_are_skipped(self):
+        assert extract_code_blocks("```python  \n\n  x = 1\n```") == ["  x = 1\n"]
+
+    def test_language_suffix_not_matched(self):
+        assert extract_code_blocks("```pythonic\nx\n```") == []
+
+    @pytest.mark.parametrize("text", [
+        "```python```python\nA```",
+        "```python \t\r\n\nA``` text ```python\nB\n```",
+        "```python\n```python\n```",
+        "````python\nA````",
+        "```python x\n```python\nB```",
+    ])
+    def test_matches_regex(self, text):
+        assert extract_code_blocks(text) == CODE_BLOCK_RE.findall(text)
+
 
 class TestValidateCode:
     # ── Dangerous patterns ──
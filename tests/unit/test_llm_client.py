@@ -0,0 +1,211 @@
+"""Tests for LLM client request bodies and stream parsing."""
+
+import io
+import json
+from unittest.mock import patch
+
+from freecad_ai.llm.client import (
+    CACHE_CONTROL,
+    PROMPT_CACHE_KEY,
+    LLMClient,
+    _encode_body,
+    _message_json,
+    clear_message_cache,
+)
+
+
+def _anthropic_client():
+    return LLMClient("anthropic", "https://api.anthropic.com", "key", "test-model")
+
+
+class TestAnthropicPromptCaching:
+    def test_system_prompt_is_cached_block(self):
+        body = _anthropic_client()._anthropic_body([], "Be helpful", stream=False)
+        assert body["system"] == [
+            {"type": "text", "text": "Be helpful", "cache_control": CACHE_CONTROL},
+        ]
+
+    def test_only_first_system_block_cached(self):
+        body = _anthropic_client()._anthropic_body(
+            [], ["Static", "Mode and document"], stream=False)
+        assert body["system"] == [
+            {"type": "text", "text": "Static", "cache_control": CACHE_CONTROL},
+            {"type": "text", "text": "Mode and document"},
+        ]
+
+    def test_no_system_key_without_prompt(self):
+        body = _anthropic_client()._anthropic_body([], "", stream=False)
+        assert "system" not in body
+
+    def test_last_tool_marked(self):
+        tools = [{"name": "a"}, {"name": "b"}]
+        body = _anthropic_client()._anthropic_body([], "", stream=False, tools=tools)
+        assert "cache_control" not in body["tools"][0]
+        assert body["tools"][1]["cache_control"] == CACHE_CONTROL
+        assert tools[1] == {"name": "b"}  # caller's schema untouched
+
+    def test_last_user_text_message_marked(self):
+        messages = [
+            {"role": "user", "content": "hi"},
+            {"role": "assistant", "content": "hello"},
+            {"role": "user", "content": "box"},
+        ]
+        body = _anthropic_client()._anthropic_body(messages, "", stream=False)
+        assert body["messages"][:2] == messages[:2]
+        assert body["messages"][2]["content"] == [
+            {"type": "text", "text": "box", "cache_control": CACHE_CONTROL},
+        ]
+        assert messages[2]["content"] == "box"
+
+    def test_last_block_of_tool_result_marked(self):
+        block = {"type": "tool_result", "tool_use_id": "t1", "content": "ok"}
+        messages = [{"role": "user", "content": [block]}]
+        body = _anthropic_client()._anthropic_body(messages, "", stream=False)
+        assert body["messages"][0]["content"][0]["cache_control"] == CACHE_CONTROL
+        assert "cache_control" not in block
+
+    def test_assistant_last_message_unchanged(self):
+        messages = [
+            {"role": "user", "content": "hi"},
+            {"role": "assistant", "content": "hello"},
+        ]
+        body = _anthropic_client()._anthropic_body(messages, "", stream=False)
+        assert body["messages"] == messages
+
+
+class TestOpenAIPromptCacheKey:
+    def test_set_for_openai(self):
+        client = LLMClient("openai", "https://api.openai.com/v1", "key", "gpt-4o")
+        body = client._openai_body([], "sys", stream=False)
+        assert body["prompt_cache_key"] == PROMPT_CACHE_KEY
+
+    def test_system_blocks_joined(self):
+        client = LLMClient("openai", "https://api.openai.com/v1", "key", "gpt-4o")
+        body = client._openai_body([], ["Static\n", "Mode"], stream=False)
+        assert body["messages"][0] == {"role": "system", "content": "Static\n\nMode"}
+
+    def test_not_sent_to_other_providers(self):
+        client = LLMClient("ollama", "http://localhost:11434/v1", "", "llama3")
+        body = client._openai_body([], "sys", stream=False)
+        assert "prompt_cache_key" not in body
+
+
+class TestOpenAIReasoningEffort:
+    def _body(self, provider, tools=None):
+        client = LLMClient(provider, "http://localhost/v1", "", "m", thinking="on")
+        return client._openai_body([], "sys", stream=False, tools=tools)
+
+    def test_openai_without_tools(self):
+        assert self._body("openai")["reasoning_effort"] == "medium"
+
+    def test_openai_with_tools(self):
+        assert "reasoning_effort" not in self._body("openai", tools=[{"name": "a"}])
+
+    def test_other_provider_without_tools(self):
+        assert self._body("openrouter")["reasoning_effort"] == "medium"
+
+    def test_other_provider_with_tools(self):
+        body = self._body("openrouter", tools=[{"name": "a"}])
+        assert "reasoning_effort" not in body
+
+
+class TestHttpStream:
+    def _events(self, data):
+        client = LLMClient("openai", "http://localhost", "", "test-model")
+        with patch("urllib.request.urlopen", return_value=io.BytesIO(data)):
+            return list(client._http_stream("http://localhost", {}, {}))
+
+    def test_parses_data_lines(self):
+        data = (b'event: message_start\n: keep-alive\n\n'
+                b'data: {"a": "\xc3\xa9"}\n\ndata: {"b": 2}\n')
+        assert self._events(data) == [{"a": "\u00e9"}, {"b": 2}]
+
+    def test_stops_at_done(self):
+        data = b'data: {"a": 1}\ndata: [DONE]\ndata: {"b": 2}\n'
+        assert self._events(data) == [{"a": 1}]
+
+    def test_skips_malformed_json(self):
+        data = b'data: {oops\ndata: {"a": 1}\n'
+        assert self._events(data) == [{"a": 1}]
+
+
+class TestCreateClientFromConfig:
+    def test_reused_while_settings_unchanged(self, monkeypatch):
+        from freecad_ai.config import AppConfig
+        from freecad_ai.llm.client import create_client_from_config
+        cfg = AppConfig()
+        monkeypatch.setattr("freecad_ai.config.get_config", lambda: cfg)
+        first = create_client_from_config()
+        assert create_client_from_config() is first
+        cfg.temperature = 0.9
+        second = create_client_from_config()
+        assert second is not first
+        assert second.temperature == 0.9
+
+    def test_clients_share_ssl_context(self):
+        a = LLMClient("openai", "https://a", "", "m")
+        b = LLMClient("anthropic", "https://b", "", "m")
+        assert a._ssl_ctx is b._ssl_ctx
+
+
+class TestEncodeBody:
+    def test_round_trips(self):
+        body = {
+            "model": "m",
+            "messages": [{"role": "user", "content": "h\u00e9 \"x\""}],
+            "stream": True,
+        }
+        assert json.loads(_encode_body(body)) == body
+
+    def test_without_messages(self):
+        assert json.loads(_encode_body({"model": "m"})) == {"model": "m"}
+
+    def test_only_messages(self):
+        body = {"messages": [{"role": "user", "content": "a"}]}
+        assert json.loads(_encode_body(body)) == body
+
+    def test_message_encoded_once(self):
+        msg = {"role": "user", "content": "cached"}
+        last = {"role": "assistant", "content": "reply"}
+        _encode_body({"model": "m", "messages": [msg, last]})
+        cached = _message_json[id(msg)]
+        _encode_body({"model": "m2", "messages": [msg, last]})
+        assert _message_json[id(msg)] is cached
+
+    def test_last_message_not_cached(self):
+        last = {"role": "user", "content": "newest"}
+        _encode_body({"model": "m", "messages": [last]})
+        assert id(last) not in _message_json
+
+    def test_cache_bounded_by_size(self, monkeypatch):
+        monkeypatch.setattr("freecad_ai.llm.client._MESSAGE_JSON_MAX_CHARS", 100)
+        clear_message_cache()
+        messages = [{"role": "user", "content": "x" * 40} for _ in range(5)]
+        body = {"messages": messages}
+        assert json.loads(_encode_body(body)) == body
+        assert 0 < len(_message_json) < 4
+
+    def test_concurrent_encodes_keep_count_consistent(self):
+        import threading
+        import freecad_ai.llm.client as client_mod
+        clear_message_cache()
+        histories = [
+            [{"role": "user", "content": f"{t}-{i}"} for i in range(50)]
+            for t in range(4)
+        ]
+        threads = [
+            threading.Thread(target=_encode_body, args=({"messages": h},))
+            for h in histories
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert client_mod._message_json_chars == sum(
+            len(text) for _, text in _message_json.values())
+
+    def test_clear_message_cache(self):
+        msg = {"role": "user", "content": "a"}
+        _encode_body({"messages": [msg, {"role": "user", "content": "b"}]})
+        clear_message_cache()
+        assert not _message_json
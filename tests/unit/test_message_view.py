@@ -0,0 +1,142 @@
+"""Tests for chat message rendering."""
+
+from freecad_ai.ui.message_view import (
+    MAX_CODE_BLOCK_CHARS,
+    MAX_ESCAPE_CACHE_CHARS,
+    MAX_TOOL_OUTPUT_CHARS,
+    _escape,
+    _escape_short,
+    _format_content,
+    _format_inline,
+    clear_render_cache,
+    render_code_block,
+    render_message,
+    render_tool_call,
+)
+
+
+class TestFormatInline:
+    def test_inline_code(self):
+        out = _format_inline("use `foo()` here")
+        assert "<code" in out
+        assert ">foo()</code>" in out
+
+    def test_bold_and_italic(self):
+        assert _format_inline("**bold** and *it*") == "<b>bold</b> and <i>it</i>"
+
+    def test_italic_inside_bold(self):
+        assert _format_inline("**a *b* c**") == "<b>a <i>b</i> c</b>"
+
+    def test_code_inside_bold(self):
+        out = _format_inline("**call `x`**")
+        assert out.startswith("<b>call <code")
+        assert out.endswith(">x</code></b>")
+
+    def test_code_content_not_formatted(self):
+        out = _format_inline("`a*b*c`")
+        assert "<i>" not in out
+        assert ">a*b*c</code>" in out
+
+    def test_plain_text_unchanged(self):
+        assert _format_inline("nothing special") == "nothing special"
+
+
+class TestFormatContent:
+    def test_code_block(self):
+        out = _format_content("Before\n```python\nx = 1\n```\nAfter")
+        assert "Before" in out
+        assert "x = 1" in out
+        assert "After" in out
+        assert "<pre" in out
+
+    def test_code_block_default_language(self):
+        out = _format_content("```\nx = 1\n```")
+        assert ">python</div>" in out
+
+    def test_think_block(self):
+        out = _format_content("<think>pondering</think>Answer")
+        assert "pondering" in out
+        assert "font-style: italic" in out
+        assert out.endswith("Answer")
+
+    def test_blocks_in_order(self):
+        out = _format_content("<think>t</think>mid```js\ncode\n```end")
+        assert out.index("t") < out.index("mid") < out.index("code") < out.index("end")
+
+    def test_text_is_escaped(self):
+        out = _format_content("<b>not bold</b>")
+        assert "&lt;b&gt;" in out
+
+    def test_code_is_escaped(self):
+        out = _format_content("```python\nif a < b:\n```")
+        assert "a &lt; b" in out
+
+
+class TestRenderMessage:
+    def test_user_label(self):
+        out = render_message("user", "Hi")
+        assert "You" in out
+        assert "Hi" in out
+
+    def test_assistant_label(self):
+        assert "AI" in render_message("assistant", "Hi")
+
+    def test_unknown_role_renders_as_system(self):
+        assert "System" in render_message("other", "Hi")
+
+    def test_content_blocks(self):
+        blocks = [
+            {"type": "text", "text": "look"},
+            {"type": "image", "media_type": "image/png", "data": "AAAA"},
+        ]
+        out = render_message("user", blocks)
+        assert "look" in out
+        assert 'href="image:1"' in out
+        assert "data:image/png;base64,AAAA" in out
+
+
+class TestTruncation:
+    def test_short_code_block_untouched(self):
+        out = render_code_block("x = 1 < 2")
+        assert "x = 1 &lt; 2" in out
+        assert "truncated" not in out
+
+    def test_long_code_block_truncated(self):
+        out = render_code_block("a" * (MAX_CODE_BLOCK_CHARS + 50))
+        assert "a" * MAX_CODE_BLOCK_CHARS in out
+        assert "a" * (MAX_CODE_BLOCK_CHARS + 1) not in out
+        assert "truncated, 50 more characters" in out
+
+    def test_tool_output_truncated_before_escape(self):
+        # Escaping would expand "<" to "&lt;"; the cut counts raw characters
+        out = render_tool_call("t", "id", started=False,
+                               output="<" * (MAX_TOOL_OUTPUT_CHARS + 10))
+        assert "&lt;" * MAX_TOOL_OUTPUT_CHARS + "..." in out
+        assert "&lt;" * (MAX_TOOL_OUTPUT_CHARS + 1) not in out
+
+
+class TestRenderCache:
+    def test_repeated_content_is_cached(self):
+        clear_render_cache()
+        text = "cached **text**"
+        first = _format_content(text)
+        assert _format_content(text) is first
+        assert _format_content.cache_info().hits == 1
+
+    def test_escaped_output_is_cached(self):
+        clear_render_cache()
+        render_code_block("a < b")
+        render_code_block("a < b")
+        assert _escape_short.cache_info().hits == 1
+
+    def test_long_text_not_cached(self):
+        clear_render_cache()
+        text = "<" * (MAX_ESCAPE_CACHE_CHARS + 1)
+        assert _escape(text) == "&lt;" * len(text)
+        assert _escape_short.cache_info().currsize == 0
+
+    def test_clear_render_cache(self):
+        _format_content("something")
+        clear_render_cache()
+        assert _format_content.cache_info().currsize == 0
+        assert _escape_short.cache_info().currsize == 0
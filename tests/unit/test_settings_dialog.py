@@ -0,0 +1,20 @@
+"""Tests for settings dialog helpers that need a Qt binding."""
+
+import pytest
+
+try:
+    import PySide6  # noqa: F401
+except ImportError:
+    pytest.importorskip("PySide2")
+
+from freecad_ai.llm.client import create_client_from_config
+from freecad_ai.ui.settings_dialog import _TestConnectionTask
+
+
+class TestClientFactory:
+    def test_factory_is_memoized_on_class(self, monkeypatch):
+        monkeypatch.setattr(_TestConnectionTask, "_create_client", None)
+        factory = _TestConnectionTask._client_factory()
+        assert factory is create_client_from_config
+        assert _TestConnectionTask._create_client is not None
+        assert _TestConnectionTask._client_factory() is factory
@@ -0,0 +1,47 @@
+"""Tests for system prompt assembly."""
+
+from freecad_ai.core import system_prompt
+from freecad_ai.core.system_prompt import (
+    ACT_MODE_TOOLS,
+    PLAN_MODE,
+    build_context_sections,
+    build_static_sections,
+    build_system_blocks,
+    build_system_prompt,
+)
+
+
+class TestSystemPromptSections:
+    def test_full_prompt_is_static_plus_request_block(self, monkeypatch):
+        monkeypatch.setattr(system_prompt, "get_document_context", lambda: "Document: \"A\"")
+        monkeypatch.setattr(system_prompt, "load_agents_md", lambda: "Use mm")
+        prompt = build_system_prompt(mode="act", tools_enabled=True)
+        static, request = build_system_blocks(mode="act", tools_enabled=True)
+        assert prompt == static + "\n" + request
+        assert request.startswith(ACT_MODE_TOOLS)
+        assert "## Current Document State\nDocument: \"A\"\n" in prompt
+        assert "## Project Instructions (from AGENTS.md)\nUse mm\n" in prompt
+
+    def test_context_follows_active_document(self, monkeypatch):
+        state = {"doc": "Document: \"A\"", "agents": "Project A"}
+        monkeypatch.setattr(system_prompt, "get_document_context", lambda: state["doc"])
+        monkeypatch.setattr(system_prompt, "load_agents_md", lambda: state["agents"])
+        first = "\n".join(build_context_sections())
+        state.update(doc="Document: \"B\"", agents="Project B")
+        second = "\n".join(build_context_sections())
+        assert "Project A" in first and "Document: \"A\"" in first
+        assert "Project B" in second and "Document: \"B\"" in second
+        assert "Project A" not in second
+
+    def test_static_sections_exclude_document(self, monkeypatch):
+        monkeypatch.setattr(system_prompt, "get_document_context", lambda: "Document: \"A\"")
+        assert "Current Document State" not in "\n".join(build_static_sections())
+
+    def test_static_block_same_for_both_modes(self, monkeypatch):
+        monkeypatch.setattr(system_prompt, "get_document_context", lambda: "")
+        monkeypatch.setattr(system_prompt, "load_agents_md", lambda: "")
+        plan = build_system_blocks(mode="plan", tools_enabled=True)
+        act = build_system_blocks(mode="act", tools_enabled=True)
+        assert plan[0] == act[0]
+        assert PLAN_MODE not in plan[0] and ACT_MODE_TOOLS not in act[0]
+        assert plan[1].startswith(PLAN_MODE)
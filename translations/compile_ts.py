@@ -11,93 +11,95 @@ Usage:
 import struct
 import xml.etree.ElementTree as ET
 import sys
-import os
+
+# Section header (tag byte + big-endian length), hash table entry, and
+# the big-endian length that follows each record tag
+_pack_BI = struct.Struct(">BI").pack
+_pack_II = struct.Struct(">II").pack
+_pack_I = struct.Struct(">I").pack
 
 
 def _elf_hash(ba: bytes) -> int:
     """Qt's elfHash for QTranslator message lookup."""
+    # Same as Qt's "h = (h << 4) + c; g = h & 0xf0000000; h ^= g >> 24;
+    # h &= ~g" on 32 bits: the top nibble is always cleared, so folding it
+    # into bits 4-7 and masking to 28 bits needs no branch
     h = 0
     for byte in ba:
-        h = ((h << 4) + byte) & 0xFFFFFFFF
-        g = h & 0xF0000000
-        if g:
-            h ^= g >> 24
-        h &= ~g & 0xFFFFFFFF
+        h = (h << 4) + byte
+        h = (h ^ ((h >> 24) & 0xF0)) & 0x0FFFFFFF
     if h == 0:
         h = 1
     return h
 
 
-def compile_ts_to_qm(ts_path: str, qm_path: str) -> int:
+def compile_ts_to_qm(ts_path: str, qm_path: str) -> tuple[int, int]:
     """Parse a .ts file and write a .qm binary file.
 
-    Returns the number of compiled messages.
+    Returns (number of compiled messages, size of the .qm file in bytes).
     """
-    tree = ET.parse(ts_path)
-    root = tree.getroot()
-
+    # Stream the XML: each <message> is handled and cleared as soon as it
+    # is complete, so the whole document tree is never held in memory.
+    # Only <context> has a <name> child, and it precedes its messages.
     messages = []
-    for context in root.findall("context"):
-        ctx_name = context.find("name").text or ""
-        for message in context.findall("message"):
-            source_el = message.find("source")
-            translation_el = message.find("translation")
-            if source_el is None or translation_el is None:
-                continue
-            source = source_el.text or ""
-            translation = translation_el.text or ""
-            if not translation:
-                continue
-            messages.append((ctx_name, source, translation))
-
-    # Build message data and hash table
+    ctx_name = ""
+    for _event, elem in ET.iterparse(ts_path, events=("end",)):
+        tag = elem.tag
+        if tag == "name":
+            ctx_name = elem.text or ""
+        elif tag == "message":
+            # findtext: None if the child is missing, "" if it is empty
+            source = elem.findtext("source")
+            translation = elem.findtext("translation")
+            if source is not None and translation:
+                messages.append((ctx_name, source, translation))
+            elem.clear()
+        elif tag == "context":
+            elem.clear()
+
     # Qt message tags: 1=End, 3=Translation, 6=SourceText, 7=Context, 8=Comment
-    msg_data = bytearray()
+    # First pass: encode each message as one record and note its offset, so
+    # the hash table (which precedes the messages) can be written first
+    records = []
     hash_entries = []
-
+    hashes = {}  # source bytes -> elfHash; the same text recurs across contexts
+    offset = 0
     for ctx, source, translation in messages:
-        h = _elf_hash(source.encode("utf-8"))
-        offset = len(msg_data)
+        src = source.encode("utf-8")
+        trans_bytes = translation.encode("utf-16-be")  # UTF-16BE
+        ctx_bytes = ctx.encode("utf-8") + b"\x00"      # UTF-8 + NUL
+        src_bytes = src + b"\x00"                      # UTF-8 + NUL
+        record = b"".join((
+            b"\x03", _pack_I(len(trans_bytes)), trans_bytes,
+            b"\x07", _pack_I(len(ctx_bytes)), ctx_bytes,
+            b"\x06", _pack_I(len(src_bytes)), src_bytes,
+            b"\x01",
+        ))
+        h = hashes.get(src)
+        if h is None:
+            h = hashes[src] = _elf_hash(src)
         hash_entries.append((h, offset))
+        records.append(record)
+        offset += len(record)
 
-        # Translation (tag 3, UTF-16BE)
-        trans_bytes = translation.encode("utf-16-be")
-        msg_data.append(3)
-        msg_data.extend(struct.pack(">I", len(trans_bytes)))
-        msg_data.extend(trans_bytes)
-
-        # Context (tag 7, UTF-8 + NUL)
-        ctx_bytes = ctx.encode("utf-8") + b"\x00"
-        msg_data.append(7)
-        msg_data.extend(struct.pack(">I", len(ctx_bytes)))
-        msg_data.extend(ctx_bytes)
-
-        # Source text (tag 6, UTF-8 + NUL)
-        src_bytes = source.encode("utf-8") + b"\x00"
-        msg_data.append(6)
-        msg_data.extend(struct.pack(">I", len(src_bytes)))
-        msg_data.extend(src_bytes)
-
-        # End (tag 1)
-        msg_data.append(1)
-
-    hash_entries.sort(key=lambda x: x[0])
-
-    hashes_data = bytearray()
-    for h, off in hash_entries:
-        hashes_data.extend(struct.pack(">II", h, off))
+    # Offsets grow in insertion order, so plain tuple order equals a stable
+    # sort by hash, without a Python key function
+    hash_entries.sort()
 
     # .qm file format: magic + sections (tag + length + data)
     MAGIC = b"\x3c\xb8\x64\x18\xca\xef\x9c\x95\xcd\x21\x1c\xbf\x60\xa1\xbd\xdd"
 
-    with open(qm_path, "wb") as f:
+    # Second pass: write the sections straight to the (buffered) file
+    with open(qm_path, "wb", buffering=1 << 20) as f:
         f.write(MAGIC)
-        f.write(struct.pack(">BI", 0x42, len(hashes_data)))
-        f.write(hashes_data)
-        f.write(struct.pack(">BI", 0x69, len(msg_data)))
-        f.write(msg_data)
+        f.write(_pack_BI(0x42, 8 * len(hash_entries)))
+        f.write(b"".join([_pack_II(h, off) for h, off in hash_entries]))
+        f.write(_pack_BI(0x69, offset))
+        f.writelines(records)
 
-    return len(messages)
+    # magic, then two sections of tag + length + data
+    nbytes = len(MAGIC) + 5 + 8 * len(hash_entries) + 5 + offset
+    return len(messages), nbytes
 
 
 if __name__ == "__main__":
@@ -107,5 +109,5 @@ if __name__ == "__main__":
 
     ts = sys.argv[1]
     qm = sys.argv[2] if len(sys.argv) > 2 else ts.replace(".ts", ".qm")
-    count = compile_ts_to_qm(ts, qm)
-    print("Compiled {} messages -> {} ({} bytes)".format(count, qm, os.path.getsize(qm)))
+    count, nbytes = compile_ts_to_qm(ts, qm)
+    print("Compiled {} messages -> {} ({} bytes)".format(count, qm, nbytes))